@@ -1,12 +1,171 @@
+import atexit
+import os
+import queue
+import threading
+import time
 import uuid
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import TimedRotatingFileHandler, QueueHandler, QueueListener
 from settings import log_root
 import logging
 
 # 在模块级别生成全局唯一ID
 RUN_UUID = str(uuid.uuid4())
 
+
+class FastFormatter(logging.Formatter):
+    """
+    缓存时间戳的格式化器
+
+    同一秒内的日志复用已格式化好的时间字符串，避免每条记录都调用 strftime
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._last_sec = None
+        self._last_time_str = ''
+
+    def format(self, record):
+        sec = int(record.created)
+        if sec != self._last_sec:
+            self._last_time_str = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(sec))
+            self._last_sec = sec
+
+        s = f"{self._last_time_str} - {RUN_UUID} - {record.name} - {record.levelname} - {record.getMessage()}"
+        # 保留异常堆栈输出
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            s = f"{s}\n{record.exc_text}"
+        if record.stack_info:
+            s = f"{s}\n{self.formatStack(record.stack_info)}"
+        return s
+
+
+class BufferedTimedRotatingFileHandler(TimedRotatingFileHandler):
+    """
+    带写缓冲的按日期轮转文件处理器
+
+    每条记录只写入内存缓冲，不再逐条 flush，由后台线程定时刷盘，把大量小 write 合并为少量大 write
+    """
+
+    def __init__(self, *args, buffer_size=65536, **kwargs):
+        # 父类构造时会调用 _open，缓冲大小需要先设置
+        self.buffer_size = buffer_size
+        super().__init__(*args, **kwargs)
+
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=self.buffer_size,
+                    encoding=self.encoding, errors=self.errors)
+
+    def emit(self, record):
+        # 同 TimedRotatingFileHandler.emit，但写入后不调用 flush，刷盘由定时线程调用 flush() 完成
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+            if self.stream is None:
+                if self.mode != 'w' or not self._closed:
+                    self.stream = self._open()
+            if self.stream:
+                self.stream.write(self.format(record) + self.terminator)
+                if _direct:
+                    # 子进程中没有定时刷盘线程，逐条落盘
+                    self.stream.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+
+class _FileRouterHandler(logging.Handler):
+    """按 logger 名称把记录分发到各自的文件处理器，子 logger (name.child) 归入最近的已注册上级"""
+
+    def emit(self, record):
+        name = record.name
+        while True:
+            handler = _file_handlers.get(name)
+            if handler is not None:
+                handler.handle(record)
+                return
+            name, dot, _ = name.rpartition('.')
+            if not dot:
+                return
+
+
+class _SwitchableQueueHandler(QueueHandler):
+    """主进程中入队交给监听线程；fork 出的子进程没有监听线程，改为在当前线程直接写入"""
+
+    def emit(self, record):
+        if _direct:
+            _dispatch(record)
+        else:
+            super().emit(record)
+
+
+# 所有 logger 共用一个队列，由后台监听线程负责真正的控制台/文件写入
+_log_queue = queue.Queue(-1)
+_formatter = FastFormatter()
+_file_handlers = {}
+_loggers = {}
+
+_console_handler = logging.StreamHandler()
+_console_handler.setLevel(logging.INFO)
+_console_handler.setFormatter(_formatter)
+
+_router_handler = _FileRouterHandler()
+_queue_handler = _SwitchableQueueHandler(_log_queue)
+
+_listener = QueueListener(_log_queue, _console_handler, _router_handler, respect_handler_level=True)
+_listener.start()
+
+# fork 出的子进程 (如 multiprocessing 进程池) 只继承队列，不继承监听线程，置位后改为直接写入
+_direct = False
+
+
+def _dispatch(record):
+    for handler in (_console_handler, _router_handler):
+        if record.levelno >= handler.level:
+            handler.handle(record)
+
+# 文件缓冲的定时刷盘间隔（秒）
+LOG_FLUSH_INTERVAL = 1.0
+_flush_stop = threading.Event()
+
+
+def _flush_file_handlers():
+    for handler in list(_file_handlers.values()):
+        handler.flush()
+
+
+def _flush_loop():
+    while not _flush_stop.wait(LOG_FLUSH_INTERVAL):
+        _flush_file_handlers()
+
+
+def _shutdown():
+    # 先排空队列，再把缓冲中的日志落盘
+    if not _direct:
+        _listener.stop()
+    _flush_stop.set()
+    _flush_file_handlers()
+
+
+def _after_fork_in_child():
+    global _direct
+    _direct = True
+
+
+threading.Thread(target=_flush_loop, name='log-flush', daemon=True).start()
+atexit.register(_shutdown)
+if hasattr(os, 'register_at_fork'):
+    # fork 前先落盘，避免缓冲内容被复制进子进程后重复写入
+    os.register_at_fork(before=_flush_file_handlers, after_in_child=_after_fork_in_child)
+
+
 def create_log(name):
+    # 同名 logger 已配置过则直接复用
+    if name in _loggers:
+        return _loggers[name]
+
     # 确保日志目录存在
     log_root.mkdir(parents=True, exist_ok=True)
 
@@ -14,27 +173,9 @@ def create_log(name):
     logger = logging.getLogger(name)
     logger.setLevel(logging.INFO)
 
-    # 清除已有的处理器
-    if logger.handlers:
-        for handler in logger.handlers:
-            handler.close()
-        logger.handlers.clear()
-
-    # 创建格式化器
-    formatter = logging.Formatter(
-        f'%(asctime)s - {RUN_UUID} - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-
-    # 创建控制台处理器
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-
     # 创建文件处理器 - 按日期轮转，保留7天日志
     log_file = log_root / f'{name}.log'
-    file_handler = TimedRotatingFileHandler(
+    file_handler = BufferedTimedRotatingFileHandler(
         filename=log_file,
         when='midnight',  # 在每天午夜轮转
         interval=1,  # 每天一个文件
@@ -42,6 +183,10 @@ def create_log(name):
         encoding='utf-8'
     )
     file_handler.setLevel(logging.INFO)
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
-    return logger
\ No newline at end of file
+    file_handler.setFormatter(_formatter)
+    _file_handlers[name] = file_handler
+
+    # logger 只挂队列处理器，调用方仅入队，不阻塞在 I/O 上
+    logger.addHandler(_queue_handler)
+    _loggers[name] = logger
+    return logger
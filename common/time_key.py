@@ -1,8 +1,13 @@
-from threading import Lock
+import time
 from datetime import datetime
 
-lock = Lock()
+# 缓存 (秒级时间戳, 格式化字符串)，同一秒内重复调用直接复用
+_last_time = (None, '')
+
 
 def get_current_time():
-    with lock:  # 加锁保证线程安全
-        return datetime.now().strftime("%Y%m%d_%H%M%S")
\ No newline at end of file
+    global _last_time
+    sec = int(time.time())
+    if _last_time[0] != sec:
+        _last_time = (sec, datetime.fromtimestamp(sec).strftime("%Y%m%d_%H%M%S"))
+    return _last_time[1]
@@ -1,22 +1,117 @@
 import os
 from common.logger import create_log
+import numpy as np
 import pandas as pd
 
+try:
+    # pyarrow 的 CSV 写入为多线程 C++ 实现，未安装时回退到 pandas
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = None
+
 logger = create_log("util_csv")
 
+# 加载K线数据时读取的列
+STOCK_DATA_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+
+# 标准化K线数据的列类型，预先声明可省去类型推断（股票代码需保持字符串，避免丢失前导0）
+STOCK_DATA_DTYPES = {
+    'open': 'float64',
+    'high': 'float64',
+    'low': 'float64',
+    'close': 'float64',
+    'volume': 'float64',
+    'amount': 'float64',
+    'stock_code': 'string',
+    'stock_name': 'string',
+    'market': 'string'
+}
+
+
+# 已确认存在的目录，避免批量保存时重复 makedirs
+_ensured_dirs = set()
+
+
+def ensure_dir(path):
+    """确保目录存在，同一目录在进程内只创建/检查一次"""
+    path = str(path)
+    if path not in _ensured_dirs:
+        os.makedirs(path, exist_ok=True)
+        _ensured_dirs.add(path)
+
 
 def save_to_csv(df, filename):
     """将数据保存到CSV文件"""
     if not df.empty:
         # 确保目录存在
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        ensure_dir(os.path.dirname(filename))
 
-        # 保存到CSV
-        df.to_csv(filename, index=False, encoding='utf-8-sig')
+        # 保存到CSV：pyarrow 只处理能与 to_csv 输出逐字节一致的数据，其余交给 pandas
+        written = False
+        if pa is not None:
+            try:
+                _write_csv_pyarrow(df, filename)
+                written = True
+            except (_PyarrowUnsupported, pa.ArrowException):
+                # 含带时间/时区的日期、布尔等列，或字符串需要加引号、object 列类型混杂
+                pass
+            except Exception as e:
+                logger.warning(f"pyarrow 写入失败，改用 pandas: {e}")
+        if not written:
+            df.to_csv(filename, index=False, encoding='utf-8-sig')
         logger.info(f"数据已保存到 {filename}")
     else:
         logger.warning("无数据可保存")
 
+class _PyarrowUnsupported(Exception):
+    """数据包含 pyarrow 无法按 to_csv 格式原样写出的列"""
+
+
+def _write_csv_pyarrow(df, filename):
+    """
+    使用pyarrow写CSV，输出与 to_csv(index=False, encoding='utf-8-sig') 逐字节一致
+
+    只支持字符串列名，以及浮点/整数/字符串/仅日期的日期列；其余情况抛出 _PyarrowUnsupported，
+    字符串需要加引号时 pyarrow 抛出 ArrowInvalid，均由调用方回退到 pandas
+    """
+    columns = df.columns
+    # 单列时 csv 模块会把空值写成 ""，与 pyarrow 不同
+    if (os.linesep != '\n' or len(columns) < 2 or not columns.is_unique
+            or not all(isinstance(name, str) for name in columns)):
+        raise _PyarrowUnsupported()
+
+    arrays = []
+    for name in columns:
+        col = df[name]
+        dtype = col.dtype
+        if not isinstance(dtype, np.dtype) and not isinstance(dtype, pd.StringDtype):
+            raise _PyarrowUnsupported()  # 时区日期、分类、可空整数等扩展类型
+        if dtype.kind == 'f':
+            # 与 pandas 相同：由 numpy astype(str) 得到最短表示（如 1.0、1e-05），NaN 写为空
+            values = col.to_numpy()
+            arrays.append(pa.array(values.astype(str), mask=np.isnan(values)))
+        elif dtype.kind in 'iu':
+            arrays.append(pa.array(col.to_numpy()))
+        elif dtype.kind == 'M':
+            # to_csv 只在全部为午夜时把日期写到天，带时间的日期格式不同
+            valid = col.dropna()
+            if not (valid == valid.dt.normalize()).all():
+                raise _PyarrowUnsupported()
+            arrays.append(pa.array(col.to_numpy()).cast(pa.date32()))
+        elif dtype == object or isinstance(dtype, pd.StringDtype):
+            arrays.append(pa.array(col.to_numpy(dtype=object), type=pa.string(), from_pandas=True))
+        else:
+            raise _PyarrowUnsupported()
+    table = pa.Table.from_arrays(arrays, names=list(columns))
+
+    with open(filename, 'wb') as f:
+        # 表头由 pandas 生成（带BOM），数据行由 pyarrow 写出，不加引号
+        f.write(df.iloc[:0].to_csv(index=False).encode('utf-8-sig'))
+        pacsv.write_csv(table, f, write_options=pacsv.WriteOptions(include_header=False,
+                                                                   quoting_style='none'))
+
+
 def load_stock_data(csv_path):
     """
     加载股票数据并设置日期索引
@@ -29,7 +124,11 @@ def load_stock_data(csv_path):
     """
     df = pd.read_csv(
         csv_path,
+        usecols=STOCK_DATA_COLUMNS,  # 只读取K线绘图/回测需要的列
+        dtype=STOCK_DATA_DTYPES,
         parse_dates=['date'],  # 解析date列为datetime类型
+        date_format='ISO8601',  # 按ISO格式解析，兼容只含日期和带时间两种写法
+        cache_dates=True,
         index_col='date'  # 将date列设为索引，方便按日期查询
     )
     return df
@@ -1,8 +1,16 @@
 import baostock as bs
+import numpy as np
 import requests
 import pandas as pd
 import json
 
+try:
+    # orjson 解析大体积 JSON 更快，未安装时回退到标准库
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 
 def get_us_stock_combined(symbol, start_date, end_date):
     """
@@ -20,29 +28,38 @@ def get_us_stock_combined(symbol, start_date, end_date):
         }
 
         response = requests.get(url, params=params, timeout=10)
-        data = response.json()
+        data = _json_loads(response.content)
 
         if 'Time Series (Daily)' in data:
             time_series = data['Time Series (Daily)']
-            df = pd.DataFrame.from_dict(time_series, orient='index')
-            df = df.rename(columns={
-                '1. open': 'open',
-                '2. high': 'high',
-                '3. low': 'low',
-                '4. close': 'close',
-                '5. volume': 'volume'
-            })
-
-            # 转换数据类型
-            for col in df.columns:
-                df[col] = pd.to_numeric(df[col])
-
-            df.index = pd.to_datetime(df.index)
+
+            # 逐日一次遍历，直接填充按列存储的 numpy 数组
+            n = len(time_series)
+            dates = np.empty(n, dtype='datetime64[D]')
+            opens = np.empty(n, dtype='float64')
+            highs = np.empty(n, dtype='float64')
+            lows = np.empty(n, dtype='float64')
+            closes = np.empty(n, dtype='float64')
+            volumes = np.empty(n, dtype='int64')
+            for i, (day, bar) in enumerate(time_series.items()):
+                dates[i] = day
+                opens[i] = float(bar['1. open'])
+                highs[i] = float(bar['2. high'])
+                lows[i] = float(bar['3. low'])
+                closes[i] = float(bar['4. close'])
+                volumes[i] = int(bar['5. volume'])
+
+            df = pd.DataFrame({
+                'open': opens,
+                'high': highs,
+                'low': lows,
+                'close': closes,
+                'volume': volumes
+            }, index=pd.DatetimeIndex(dates))
             df = df.sort_index()
 
-            # 筛选日期范围
-            mask = (df.index >= pd.to_datetime(start_date)) & (df.index <= pd.to_datetime(end_date))
-            df = df[mask]
+            # 筛选日期范围（索引已排序，按切片二分查找）
+            df = df.loc[pd.to_datetime(start_date):pd.to_datetime(end_date)]
 
             return df
 
@@ -1,16 +1,21 @@
 import datetime
 import os
+from concurrent.futures import ThreadPoolExecutor
 import akshare as ak
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
 
 from common.logger import create_log
-from common.util_csv import save_to_csv
+from common.util_csv import save_to_csv, ensure_dir
 from core.stock.manager_common import standardize_stock_data
 from settings import stock_data_root
 
 logger = create_log('manage_akshare')
 
+# 保存前需要保留2位小数的数值列（volume 为整数成交量，不参与取整，保持原整数类型写出）
+ROUND_COLUMNS = ['open', 'high', 'low', 'close', 'amount']
+
 
 def get_hk_stock_history(stock_code: str, start_date: str, end_date: str, adjust_type: str = 'qfq') -> DataFrame:
     """
@@ -78,12 +83,14 @@ def get_single_hk_stock_history(stock_code: str, start_date: str, end_date: str,
 
             # 确保输出目录存在
             output_path = os.path.join(stock_data_root, output_dir)
-            os.makedirs(output_path, exist_ok=True)
+            ensure_dir(output_path)
 
             # 保存到CSV
             csv_name = f"{stock_code}_{stock_name}_{start_date_formatted}_{end_date_formatted}.csv"
             filename = os.path.join(output_path, csv_name)
-            save_to_csv(df.round(2), filename)
+            # 仅对数值列保留2位小数，避免整表复制
+            df[ROUND_COLUMNS] = np.round(df[ROUND_COLUMNS].to_numpy(dtype='float64'), 2)
+            save_to_csv(df, filename)
 
             logger.info(f"数据已成功保存至: {filename}")
             return True, csv_name
@@ -95,6 +102,26 @@ def get_single_hk_stock_history(stock_code: str, start_date: str, end_date: str,
         return False, None
 
 
+def get_many_hk_stock_history(stock_codes: list, start_date: str, end_date: str,
+                              adjust_type: str = 'qfq', output_dir: str = 'akshare', max_workers: int = 8):
+    """
+    并发获取多只港股的历史数据并保存到CSV
+
+    参数:
+        stock_codes: 港股代码列表，例如 ["00700", "09988"]
+        max_workers: 并发线程数，受数据源限流约束，不宜过大
+
+    返回:
+        list: 与 stock_codes 顺序一致的 (是否成功, csv_name) 列表
+    """
+    def _fetch(stock_code):
+        return get_single_hk_stock_history(stock_code, start_date, end_date, adjust_type, output_dir)
+
+    # 网络请求为主，线程在等待HTTP响应时释放GIL
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_fetch, stock_codes))
+
+
 def get_us_history(stock_code: str, start_date: str, end_date: str) -> DataFrame:
     """
     获取美国历史数据
@@ -174,12 +201,14 @@ def get_single_us_history(stock_code: str, start_date: str, end_date: str,
 
             # 确保输出目录存在
             output_path = os.path.join(stock_data_root, output_dir)
-            os.makedirs(output_path, exist_ok=True)
+            ensure_dir(output_path)
 
             # 保存到CSV
             csv_name = f"US.{stock_code}_{stock_name}_{start_date_formatted}_{end_date_formatted}.csv"
             filename = os.path.join(output_path, csv_name)
-            save_to_csv(df.round(2), filename)
+            # 仅对数值列保留2位小数，避免整表复制
+            df[ROUND_COLUMNS] = np.round(df[ROUND_COLUMNS].to_numpy(dtype='float64'), 2)
+            save_to_csv(df, filename)
 
             logger.info(f"数据已成功保存至: {filename}")
             return True, csv_name
@@ -1,6 +1,33 @@
 import pandas as pd
 from pandas import DataFrame
 
+# 定义中文到英文的列名映射
+_CN_TO_EN = {
+    '日期': 'date',
+    '交易日期': 'date',
+    '开盘': 'open',
+    '开盘价': 'open',
+    '收盘': 'close',
+    '收盘价': 'close',
+    '最高': 'high',
+    '最高价': 'high',
+    '最低': 'low',
+    '最低价': 'low',
+    '成交量': 'volume',
+    '成交量(股)': 'volume',
+    '成交额': 'amount',
+    '成交额(元)': 'amount',
+    '成交额(港元)': 'amount',
+    '振幅': 'amplitude',
+    '振幅(%)': 'amplitude',
+    '涨跌幅': 'change_pct',
+    '涨跌幅(%)': 'change_pct',
+    '涨跌额': 'change',
+    '换手率': 'turnover_rate',
+    '换手率(%)': 'turnover_rate'
+}
+
+
 def standardize_stock_data(df: DataFrame, stock_code: str, stock_name: str, market) -> DataFrame:
     """
     标准化股票数据为统一的英文表头格式
@@ -10,50 +37,24 @@ def standardize_stock_data(df: DataFrame, stock_code: str, stock_name: str, mark
     df['stock_name'] = stock_name
     df['market'] = market
 
-    # 定义中文到英文的列名映射
-    cn_to_en_map = {
-        '日期': 'date',
-        '交易日期': 'date',
-        '开盘': 'open',
-        '开盘价': 'open',
-        '收盘': 'close',
-        '收盘价': 'close',
-        '最高': 'high',
-        '最高价': 'high',
-        '最低': 'low',
-        '最低价': 'low',
-        '成交量': 'volume',
-        '成交量(股)': 'volume',
-        '成交额': 'amount',
-        '成交额(元)': 'amount',
-        '成交额(港元)': 'amount',
-        '振幅': 'amplitude',
-        '振幅(%)': 'amplitude',
-        '涨跌幅': 'change_pct',
-        '涨跌幅(%)': 'change_pct',
-        '涨跌额': 'change',
-        '换手率': 'turnover_rate',
-        '换手率(%)': 'turnover_rate'
-    }
-
-    # 重命名列
-    renamed_columns = {col: cn_to_en_map.get(col, col) for col in df.columns}
-    df = df.rename(columns=renamed_columns)
+    # 重命名列（rename 会忽略不存在的列）
+    df = df.rename(columns=_CN_TO_EN)
 
     # 确保所有必需的列存在
     required_columns = ['date', 'open', 'high', 'low', 'close', 'volume', 'amount',
                         'stock_code', 'stock_name', 'market']
 
-    # 添加缺失的列并设置为NaN
-    for col in required_columns:
-        if col not in df.columns:
-            df[col] = pd.NA
+    # 一次性补齐缺失列（NaN）并按必需列排序
+    df = df.reindex(columns=required_columns)
 
-    # 确保日期格式正确
-    if 'date' in df.columns:
-        df['date'] = pd.to_datetime(df['date'])
+    # 确保日期格式正确，已是datetime类型则跳过；优先按 YYYY-MM-DD 快速解析，格式不符时回退到自动推断
+    if not pd.api.types.is_datetime64_any_dtype(df['date']):
+        try:
+            df['date'] = pd.to_datetime(df['date'], format='%Y-%m-%d', cache=True)
+        except (ValueError, TypeError):
+            df['date'] = pd.to_datetime(df['date'], cache=True)
 
-    # 只保留需要的列并按日期排序
-    df = df[required_columns].sort_values('date')
+    # 按日期排序（数据源返回的基本有序，mergesort 更快且稳定）
+    df.sort_values('date', inplace=True, kind='mergesort')
 
     return df
\ No newline at end of file
@@ -1,27 +1,35 @@
 import datetime
 import pandas as pd
 
+def to_record_date(date):
+    # datetime.date/datetime.datetime/str 均可直接转换为pandas Timestamp
+    if not isinstance(date, (datetime.date, str)):
+        raise ValueError('date must be datetime.date or str')
+    return pd.Timestamp(date)
+
+
 class SignalRecordManager:
+    """按列存储信号记录，转换DataFrame时无需逐条对象转置"""
+
     def __init__(self):
-        self.signal_records = []
+        self._dates = []
+        self._signal_types = []
+        self._signal_descriptions = []
 
     def add_signal_record(self, date, signal_type, signal_description):
-        self.signal_records.append(SignalRecord(date, signal_type, signal_description))
+        self._dates.append(to_record_date(date))
+        self._signal_types.append(signal_type)
+        self._signal_descriptions.append(signal_description)
 
     def transform_to_dataframe(self):
-        return pd.DataFrame([record.__dict__ for record in self.signal_records])
+        return pd.DataFrame({
+            'date': self._dates,
+            'signal_type': self._signal_types,
+            'signal_description': self._signal_descriptions
+        })
 
 class SignalRecord:
     def __init__(self, date, signal_type, signal_description):
-        if type(date) is datetime.date:
-            # 将datetime.date转换为pandas Timestamp
-            self.date = pd.Timestamp(date)
-            # self.date = date.strftime('%Y-%m-%d')
-        elif type(date) is str:
-            # 将字符串转换为pandas Timestamp
-            self.date = pd.Timestamp(date)
-            # self.date = date
-        else:
-            raise ValueError('date must be datetime.date or str')
+        self.date = to_record_date(date)
         self.signal_type = signal_type
         self.signal_description = signal_description
\ No newline at end of file
@@ -13,7 +13,8 @@ logger = create_log("strategy_manager")
 class StrategyManager:
 
     def __init__(self):
-        self.strategy_list = []
+        # 以策略类为key（dict保持注册顺序），O(1)判重
+        self.strategies = {}
         self.strategy_map = {}
         self._auto_discover_strategies()
 
@@ -64,8 +65,8 @@ class StrategyManager:
 
     def register_strategy(self, strategy_class):
         """注册一个策略类"""
-        if strategy_class not in self.strategy_list:
-            self.strategy_list.append(strategy_class)
+        if strategy_class not in self.strategies:
+            self.strategies[strategy_class] = strategy_class
             # 使用类名作为key，方便前端通过名称查找策略类
             self.strategy_map[strategy_class.__name__] = strategy_class
             logger.info(f"Registered strategy: {strategy_class.__name__}")
@@ -76,7 +77,7 @@ class StrategyManager:
 
     def get_all_strategies(self):
         """获取所有注册的策略类"""
-        return self.strategy_list
+        return list(self.strategies)
 
     def get_strategy_names(self):
         """获取所有注册的策略类名"""
@@ -1,22 +1,37 @@
-import datetime
 import pandas as pd
 import backtrader as bt
 from common.logger import create_log
+from core.strategy.indicator.common import to_record_date
 import settings
 
 logger = create_log("trade_strategy_common")
 
+# 模块导入时取一次settings字典，参数默认值直接用dict.get，避免 hasattr+getattr
+_get = settings.__dict__.get
+
 
 class TradeRecordManager:
+    """按列存储交易记录，转换DataFrame时无需逐条对象转置"""
+
+    COLUMNS = ['date', 'trade_id', 'action', 'price', 'size', 'total_amount', 'commission', 'order_type', 'status']
+
     def __init__(self):
-        self.trade_records = []
+        self._columns = {col: [] for col in self.COLUMNS}
 
     def add_trade_record(self, trade_id, date, action, price, size, total_amount, commission, order_type, status):
-        self.trade_records.append(
-            TradeRecord(trade_id, date, action, price, size, total_amount, commission, order_type, status))
+        columns = self._columns
+        columns['date'].append(to_record_date(date))
+        columns['trade_id'].append(trade_id)
+        columns['action'].append(action)
+        columns['price'].append(price)
+        columns['size'].append(size)
+        columns['total_amount'].append(total_amount)
+        columns['commission'].append(commission)
+        columns['order_type'].append(order_type)
+        columns['status'].append(status)
 
     def transform_to_dataframe(self):
-        return pd.DataFrame([record.__dict__ for record in self.trade_records])
+        return pd.DataFrame(self._columns)
 
 
 class TradeRecord:
@@ -33,17 +48,7 @@ class TradeRecord:
     """
 
     def __init__(self, trade_id, date, action, price, size, total_amount, commission, order_type, status):
-        if type(date) is datetime.date:
-            # 将datetime.date转换为pandas Timestamp
-            self.date = pd.Timestamp(date)
-            # self.date = date.strftime('%Y-%m-%d')
-        elif type(date) is str:
-            # 将字符串转换为pandas Timestamp
-            self.date = pd.Timestamp(date)
-            # self.date = date
-        else:
-            logger.info(type(date))
-            raise ValueError('date must be datetime.date or str')
+        self.date = to_record_date(date)
         self.trade_id = trade_id
         self.action = action
         self.price = price
@@ -61,16 +66,16 @@ class StrategyBase(bt.Strategy):
     """
     params = (
         # 交易股票最小单位（股）
-        ('min_order_size', settings.MIN_ORDER_SIZE if hasattr(settings, 'MIN_ORDER_SIZE') else 100),
+        ('min_order_size', _get('MIN_ORDER_SIZE', 100)),
         # 最大持仓比例 = 总持仓股票数量 * 持仓股票价格 / 总资产
         ('max_portfolio_percent',
-         settings.MAX_PORTFOLIO_PERCENT if hasattr(settings, 'MAX_PORTFOLIO_PERCENT') else 0.8),
+         _get('MAX_PORTFOLIO_PERCENT', 0.8)),
         # 单笔交易百分比（买） = 单笔交易费用（ 单笔交易股票价格 * 单笔交易量） / 总资产
         ('max_single_buy_percent',
-         settings.MAX_SINGLE_BUY_PERCENT if hasattr(settings, 'MAX_SINGLE_BUY_PERCENT') else 0.2),
+         _get('MAX_SINGLE_BUY_PERCENT', 0.2)),
         # 单笔交易百分比（卖） = 单笔交易费用（ 单笔交易股票价格 * 单笔交易量） / 总资产
         ('max_single_sell_percent',
-         settings.MAX_SINGLE_SELL_PERCENT if hasattr(settings, 'MAX_SINGLE_SELL_PERCENT') else 0.3),
+         _get('MAX_SINGLE_SELL_PERCENT', 0.3)),
 
     )
 
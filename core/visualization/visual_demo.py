@@ -1,5 +1,63 @@
 import pandas as pd
 
+# 示例数据在模块导入时按列构建一次，调用方拿到的是副本
+_SAMPLE_SIGNALS = pd.DataFrame({
+    'date': pd.to_datetime([
+        '2000-01-15',  # 仅信号，未操作
+        '2000-01-17',  # 信号+操作
+        '2000-02-18',  # 仅信号，未操作
+        '2000-02-20',  # 信号+操作
+        '2000-03-18',  # 仅信号，未操作
+        '2000-03-20',  # 信号+操作
+        '2000-04-13',  # 仅信号，未操作
+        '2000-04-15',  # 信号+操作
+        '2000-05-06',  # 仅信号，未操作
+        '2000-05-08',  # 信号+操作
+        '2000-06-10',  # 仅信号，未操作
+        '2000-06-12',  # 信号+操作
+        '2000-07-28',  # 仅信号，未操作
+        '2000-07-30',  # 信号+操作
+        '2000-08-23',  # 仅信号，未操作
+        '2000-08-25',  # 信号+操作
+    ], format='%Y-%m-%d', cache=True),
+    'signal_type': [
+        'normal_buy', 'normal_buy', 'strong_buy', 'strong_buy',
+        'normal_sell', 'normal_sell', 'strong_sell', 'strong_sell',
+        'normal_buy', 'normal_buy', 'strong_buy', 'strong_buy',
+        'normal_sell', 'normal_sell', 'strong_sell', 'strong_sell',
+    ],
+    'signal_description': [
+        '多', '多(执行)', '强多', '强多(执行)',
+        '空', '空(执行)', '强空', '强空(执行)',
+        '多', '多(执行)', '强多', '强多(执行)',
+        '空', '空(执行)', '强空', '强空(执行)',
+    ],
+})
+
+_SAMPLE_TRADES = pd.DataFrame({
+    'date': pd.to_datetime([
+        '2000-01-17', '2000-02-20', '2000-03-20', '2000-04-15',
+        '2000-05-08', '2000-06-12', '2000-07-30', '2000-08-25',
+    ], format='%Y-%m-%d', cache=True),
+    'action': ['B', 'B', 'S', 'S', 'B', 'B', 'S', 'S'],
+    'signal_type': [
+        'normal_buy', 'strong_buy', 'normal_sell', 'strong_sell',
+        'normal_buy', 'strong_buy', 'normal_sell', 'strong_sell',
+    ],
+    'shares': [200, 300, 200, 100, 200, 250, 200, 250],
+})
+
+_SAMPLE_ASSETS = pd.DataFrame({
+    'date': pd.to_datetime([
+        '2000-01-15',  # 初始资金
+        '2000-01-17',
+        '2000-02-20',
+        '2000-03-20',
+        '2000-04-15',
+    ], format='%Y-%m-%d', cache=True),
+    'total_assets': [1000000, 799800, 409400, 1200200, 2000300],
+})
+
 
 def get_sample_signal_records():
     """
@@ -8,27 +66,7 @@ def get_sample_signal_records():
     返回:
         信号记录DataFrame
     """
-    signal_records = pd.DataFrame([
-        {'date': '2000-01-15', 'signal_type': 'normal_buy', 'signal_description': '多'},  # 仅信号，未操作
-        {'date': '2000-01-17', 'signal_type': 'normal_buy', 'signal_description': '多(执行)'},  # 信号+操作
-        {'date': '2000-02-18', 'signal_type': 'strong_buy', 'signal_description': '强多'},  # 仅信号，未操作
-        {'date': '2000-02-20', 'signal_type': 'strong_buy', 'signal_description': '强多(执行)'},  # 信号+操作
-        {'date': '2000-03-18', 'signal_type': 'normal_sell', 'signal_description': '空'},  # 仅信号，未操作
-        {'date': '2000-03-20', 'signal_type': 'normal_sell', 'signal_description': '空(执行)'},  # 信号+操作
-        {'date': '2000-04-13', 'signal_type': 'strong_sell', 'signal_description': '强空'},  # 仅信号，未操作
-        {'date': '2000-04-15', 'signal_type': 'strong_sell', 'signal_description': '强空(执行)'},  # 信号+操作
-        {'date': '2000-05-06', 'signal_type': 'normal_buy', 'signal_description': '多'},  # 仅信号，未操作
-        {'date': '2000-05-08', 'signal_type': 'normal_buy', 'signal_description': '多(执行)'},  # 信号+操作
-        {'date': '2000-06-10', 'signal_type': 'strong_buy', 'signal_description': '强多'},  # 仅信号，未操作
-        {'date': '2000-06-12', 'signal_type': 'strong_buy', 'signal_description': '强多(执行)'},  # 信号+操作
-        {'date': '2000-07-28', 'signal_type': 'normal_sell', 'signal_description': '空'},  # 仅信号，未操作
-        {'date': '2000-07-30', 'signal_type': 'normal_sell', 'signal_description': '空(执行)'},  # 信号+操作
-        {'date': '2000-08-23', 'signal_type': 'strong_sell', 'signal_description': '强空'},  # 仅信号，未操作
-        {'date': '2000-08-25', 'signal_type': 'strong_sell', 'signal_description': '强空(执行)'},  # 信号+操作
-    ])
-    # 将日期转换为datetime类型
-    signal_records['date'] = pd.to_datetime(signal_records['date'])
-    return signal_records
+    return _SAMPLE_SIGNALS.copy()
 
 def get_sample_trade_records():
     """
@@ -37,28 +75,7 @@ def get_sample_trade_records():
     返回:
         交易记录DataFrame
     """
-    trade_records = pd.DataFrame([
-        {'date': '2000-01-17', 'action': 'B', 'signal_type': 'normal_buy', 'shares': 200},
-        {'date': '2000-02-20', 'action': 'B', 'signal_type': 'strong_buy', 'shares': 300},
-        {'date': '2000-03-20', 'action': 'S', 'signal_type': 'normal_sell', 'shares': 200},
-        {'date': '2000-04-15', 'action': 'S', 'signal_type': 'strong_sell', 'shares': 100},
-        {'date': '2000-05-08', 'action': 'B', 'signal_type': 'normal_buy', 'shares': 200},
-        {'date': '2000-06-12', 'action': 'B', 'signal_type': 'strong_buy', 'shares': 250},
-        {'date': '2000-07-30', 'action': 'S', 'signal_type': 'normal_sell', 'shares': 200},
-        {'date': '2000-08-25', 'action': 'S', 'signal_type': 'strong_sell', 'shares': 250},
-    ])
-    # 将日期转换为datetime类型
-    trade_records['date'] = pd.to_datetime(trade_records['date'])
-    return trade_records
+    return _SAMPLE_TRADES.copy()
 
 def get_sample_asset_records():
-    asset_records = pd.DataFrame([
-        {'date': '2000-01-15', 'total_assets': 1000000},  # 初始资金
-        {'date': '2000-01-17', 'total_assets': 799800},
-        {'date': '2000-02-20', 'total_assets': 409400},
-        {'date': '2000-03-20', 'total_assets': 1200200},
-        {'date': '2000-04-15', 'total_assets': 2000300}
-    ])
-    # 将日期转换为datetime类型
-    asset_records['date'] = pd.to_datetime(asset_records['date'])
-    return asset_records
\ No newline at end of file
+    return _SAMPLE_ASSETS.copy()
@@ -1,5 +1,7 @@
+import logging
 import os
 from datetime import datetime
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
@@ -9,8 +11,58 @@ from common.time_key import get_current_time
 from common.util_csv import load_stock_data
 from core.visualization.visual_demo import get_sample_signal_records, get_sample_trade_records, get_sample_asset_records
 from settings import stock_data_root, html_root
+
 logger = create_log('visual_tools_plotly')
 
+# 曲线类trace的数据点数超过该值时，先降采样再生成trace（K线与柱状图保持原始数据）
+MAX_CHART_POINTS = 5000
+
+# 信号标记：按信号类型区分买卖方向、标记颜色与文字
+BUY_SIGNAL_TYPES = ['strong_buy', 'normal_buy']
+SELL_SIGNAL_TYPES = ['strong_sell', 'normal_sell']
+SIGNAL_MARKER_COLORS = {
+    'strong_buy': 'green',
+    'normal_buy': 'lightgreen',
+    'strong_sell': 'red',
+    'normal_sell': 'lightcoral',
+}
+SIGNAL_MARKER_TEXTS = {
+    'strong_buy': '强多',
+    'normal_buy': '多',
+    'strong_sell': '强空',
+    'normal_sell': '空',
+}
+
+
+def downsample_line(x, y, max_points=MAX_CHART_POINTS):
+    """
+    长序列曲线按桶保留首尾与最小/最大值点（共约 max_points 个），保留峰谷形状
+
+    在生成trace之前完成，导出的静态HTML不依赖任何后端；NaN点直接跳过（曲线本就不绘制）
+
+    参数:
+        x: 横轴（日期索引，支持按位置数组取值）
+        y: 数值序列
+        max_points: 降采样后的最大点数
+
+    返回:
+        (x, y) 降采样后的横轴与数值，点数不超过 max_points 时原样返回
+    """
+    values = np.asarray(y, dtype='float64')
+    if len(values) <= max_points:
+        return x, y
+
+    pos = np.flatnonzero(~np.isnan(values))
+    valid = values[pos]
+    edges = np.linspace(0, len(valid), max_points // 4 + 1).astype(int)
+    keep = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end > start:
+            bucket = valid[start:end]
+            keep.extend((start, end - 1, start + int(bucket.argmin()), start + int(bucket.argmax())))
+    keep = np.unique(keep)
+    return x[pos[keep]], valid[keep]
+
 
 def prepare_continuous_dates(df):
     """
@@ -25,8 +77,8 @@ def prepare_continuous_dates(df):
     # 获取数据的最小和最大日期
     min_date = df.index.min()
     max_date = df.index.max()
-    # 创建包含所有日期的连续索引（包括周末和节假日）
-    continuous_dates = pd.date_range(start=min_date, end=max_date, freq='D')
+    # 创建按工作日连续的索引（包括节假日，不含周末），并保留数据中实际存在的周末交易日
+    continuous_dates = pd.bdate_range(start=min_date, end=max_date).union(df.index)
     # 使用reindex将原始数据填充到连续日期索引中，非交易日数据为NaN
     df_continuous = df.reindex(continuous_dates)
     return df_continuous
@@ -61,11 +113,12 @@ def filter_valid_dates(df, records):
         return records  # 如果没有找到类似日期的列，返回原始记录
 
     valid_dates = df.index  # 股票数据中所有存在的日期
-    valid_records = records[records['date'].isin(valid_dates)].copy()
+    mask = records['date'].isin(valid_dates)
+    valid_records = records.loc[mask].copy()
 
-    # 提示缺失的日期
-    missing_dates = records[~records['date'].isin(valid_dates)]['date']
-    if not missing_dates.empty:
+    # 提示缺失的日期（日志级别不输出INFO时跳过字符串格式化）
+    if not mask.all() and logger.isEnabledFor(logging.INFO):
+        missing_dates = records.loc[~mask, 'date']
         logger.info(f"警告：以下日期在股票数据中不存在，已跳过：{missing_dates.dt.strftime('%Y-%m-%d').tolist()}")
 
     return valid_records
@@ -92,67 +145,49 @@ def calculate_holdings(df_continuous, valid_trades, initial_capital):
         holdings_data['total_assets'] = initial_capital
         return holdings_data
 
-    # 初始化持仓量和资金
-    total_holdings = 0  # 当前持仓量
-    capital = initial_capital   # 剩余资金
-    holdings_value = 0
-    total_cost = 0.0  # 总持仓成本
-    adjusted_cost = 0.0    # 持仓成本
-
-    # 计算持仓量变化和总资产变化
-    holdings_history = []
-    asset_history = []
-    adjusted_cost_history = []
-
-
-    for date in df_continuous.index:
-        # 检查该日期是否有交易
-        day_trades = valid_trades[valid_trades['date'] == date]
-        for _, trade in day_trades.iterrows():
-            if trade['action'] == 'B':
-                # 买入，持仓量增加
-                if date in df_continuous.index.dropna():
-                    buy_price = trade['price']
-                    buy_size = trade['size']
-                    commission = trade['commission']
-                    current_cost = buy_size * buy_price + commission
-                    total_cost += current_cost
-                    capital -= current_cost
-                    total_holdings += buy_size
-                    adjusted_cost = total_cost / total_holdings
-            elif trade['action'] == 'S':
-                # 卖出，持仓量减少
-                if date in df_continuous.index.dropna():
-                    sell_price = trade['price']
-                    sell_size = trade['size']
-                    commission = trade['commission']
-                    current_cost = sell_size * sell_price - commission
-                    total_cost -= current_cost
-                    capital += current_cost
-                    total_holdings -= sell_size
-                    # 如果全部卖出，重置持仓成本
-                    if total_holdings <= 0:
-                        adjusted_cost = 0.0
-                        total_cost = 0.0
-                        total_holdings = 0
-                    else:
-                        adjusted_cost = total_cost / total_holdings
-
-        # 保存当日持仓量
-        holdings_history.append(total_holdings)
-        adjusted_cost_history.append(adjusted_cost)
-
-        # 计算总资产（现金+持仓市值）
-        if date in df_continuous.index.dropna():
-            current_price = df_continuous.loc[date, 'close']
-            holdings_value = total_holdings * current_price
-        total_assets = capital + holdings_value
-        asset_history.append(total_assets)
-
-    # 添加持仓量和总资产数据到DataFrame
-    holdings_data['holdings'] = holdings_history
-    holdings_data['total_assets'] = asset_history
-    holdings_data['adjusted_cost'] = adjusted_cost_history
+    # 只处理落在连续日期内的买卖记录，按日期稳定排序（同日保持原顺序）
+    trades = valid_trades[valid_trades['date'].isin(df_continuous.index) & valid_trades['action'].isin(['B', 'S'])]
+    trades = trades.sort_values('date', kind='mergesort')
+    if trades.empty:
+        holdings_data['total_assets'] = initial_capital + holdings_data['holdings'] * df_continuous['close']
+        return holdings_data
+
+    is_buy = (trades['action'] == 'B').to_numpy()
+    size = trades['size'].to_numpy(dtype='float64')
+    gross = size * trades['price'].to_numpy(dtype='float64')
+    commission = trades['commission'].to_numpy(dtype='float64')
+
+    # 每笔交易的持仓变化、资金变化（买入付出成交额+佣金，卖出收回成交额-佣金）
+    signed_size = np.where(is_buy, size, -size)
+    cash_flow = np.where(is_buy, -(gross + commission), gross - commission)
+
+    # 逐笔累计得到交易后的持仓量和剩余资金。卖出超过持仓时持仓归零（h = max(0, h_prev + x)），
+    # 等价于累计和减去其历史最小值中的负数部分
+    running = np.cumsum(signed_size)
+    holdings_after = running - np.minimum(np.minimum.accumulate(running), 0)
+    capital_after = initial_capital + np.cumsum(cash_flow)
+
+    # 卖出后全部清仓则持仓成本清零：按清仓点划分持仓区间，区间内累计成本
+    cleared = ~is_buy & (holdings_after <= 0)
+    episode = np.concatenate(([0], np.cumsum(cleared[:-1])))
+    total_cost = pd.Series(-cash_flow).groupby(episode).cumsum().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        adjusted_cost = np.where(cleared, 0.0, total_cost / holdings_after)
+
+    # 取每个交易日最后一笔交易后的状态，映射到连续日期并向后填充
+    state = pd.DataFrame({
+        'holdings': holdings_after,
+        'capital': capital_after,
+        'adjusted_cost': adjusted_cost
+    }, index=trades['date'].to_numpy())
+    state = state.groupby(level=0).last().reindex(df_continuous.index).ffill()
+
+    holdings_data['holdings'] = state['holdings'].fillna(0).to_numpy()
+    holdings_data['adjusted_cost'] = state['adjusted_cost'].fillna(0.0).to_numpy()
+    capital = state['capital'].fillna(initial_capital)
+
+    # 计算总资产（现金+持仓市值），非交易日收盘价为空，总资产同样为空
+    holdings_data['total_assets'] = capital + holdings_data['holdings'] * df_continuous['close']
 
     return holdings_data
 
@@ -230,11 +265,16 @@ def create_trading_chart(chart_title_prefix, df, valid_signals, valid_trades, ho
         row=3, col=1
     )
 
+    # 曲线点数较多时先降采样
+    holdings_x, holdings_y = downsample_line(holdings_data.index, holdings_data['holdings'])
+    assets_x, assets_y = downsample_line(holdings_data.index, holdings_data['total_assets'])
+    cost_x, cost_y = downsample_line(holdings_data.index, holdings_data['adjusted_cost'])
+
     # 4. 添加持仓量变化曲线
     fig.add_trace(
         go.Scatter(
-            x=holdings_data.index,
-            y=holdings_data['holdings'],
+            x=holdings_x,
+            y=holdings_y,
             mode='lines',
             name='持仓量',
             line=dict(color='blue', width=2)
@@ -245,8 +285,8 @@ def create_trading_chart(chart_title_prefix, df, valid_signals, valid_trades, ho
     # 5. 添加总资产变化曲线和初始资金参考线
     fig.add_trace(
         go.Scatter(
-            x=holdings_data.index,
-            y=holdings_data['total_assets'],
+            x=assets_x,
+            y=assets_y,
             mode='lines',
             name='总资产',
             line=dict(color='purple', width=2),
@@ -268,8 +308,8 @@ def create_trading_chart(chart_title_prefix, df, valid_signals, valid_trades, ho
     # 6. 添加持仓成本变化曲线
     fig.add_trace(
         go.Scatter(
-            x=holdings_data.index,
-            y=holdings_data['adjusted_cost'],
+            x=cost_x,
+            y=cost_y,
             mode='lines',
             name='持仓成本',
             line=dict(color='orange', width=2)
@@ -277,105 +317,67 @@ def create_trading_chart(chart_title_prefix, df, valid_signals, valid_trades, ho
         row=6, col=1
     )
 
+    # 信号/交易标记的价格定位数组，按日期位置一次性取值
+    # （valid_signals/valid_trades已过滤为df中存在的日期，get_indexer不会返回-1）
+    low_values = df['low'].to_numpy()
+    high_values = df['high'].to_numpy()
+    close_values = df['close'].to_numpy()
+
     # 6. 添加信号点标记
     # 首先检查valid_signals是否有效
     if valid_signals is not None and not valid_signals.empty and all(col in valid_signals.columns for col in ['date', 'signal_type', 'signal_description']):
-        # 强买入信号（绿色，圆形）
-        strong_buy_signals = valid_signals[valid_signals['signal_type'] == 'strong_buy']
-        if not strong_buy_signals.empty:
-            fig.add_trace(
-                go.Scatter(
-                    x=strong_buy_signals['date'],
-                    y=df.loc[strong_buy_signals['date'], 'low'] * 0.95,
-                    mode='markers+text',
-                    name='强买入信号',
-                    marker=dict(
-                        symbol='circle',
-                        color='green',
-                        size=10,
-                        line=dict(width=1, color='black')
-                    ),
-                    text=['强多' for _ in range(len(strong_buy_signals))],
-                    textposition='bottom center',
-                    texttemplate='%{text}',
-                    textfont=dict(family="SimHei, Arial", size=12, color="darkgreen", weight="bold"),
-                    hovertemplate='日期: %{x}<br>信号: %{customdata[0]}<extra></extra>',
-                    customdata=strong_buy_signals[['signal_description']].values,
-                    showlegend=True
-                ), row=1, col=1
-            )
-
-        # 买入信号（浅绿色，圆形）
-        buy_signals = valid_signals[valid_signals['signal_type'] == 'normal_buy']
+        # 强/普通信号合并为买、卖两条trace，逐点指定标记颜色与文字
+        signal_types = valid_signals['signal_type']
+        is_buy_signal = signal_types.isin(BUY_SIGNAL_TYPES).to_numpy()
+        is_sell_signal = signal_types.isin(SELL_SIGNAL_TYPES).to_numpy()
+        # 买入标记在最低价下方5%，卖出标记在最高价上方5%
+        signal_pos = df.index.get_indexer(valid_signals['date'])
+        signal_y = np.where(is_buy_signal, low_values[signal_pos] * 0.95, high_values[signal_pos] * 1.05)
+
+        # 买入信号（强多：绿色，多：浅绿色，圆形，K线下方）
+        buy_signals = valid_signals.loc[is_buy_signal]
         if not buy_signals.empty:
             fig.add_trace(
                 go.Scatter(
                     x=buy_signals['date'],
-                    y=df.loc[buy_signals['date'], 'low'] * 0.95,
+                    y=signal_y[is_buy_signal],
                     mode='markers+text',
                     name='买入信号',
                     marker=dict(
                         symbol='circle',
-                        color='lightgreen',
+                        color=buy_signals['signal_type'].map(SIGNAL_MARKER_COLORS).to_numpy(),
                         size=10,
                         line=dict(width=1, color='black')
                     ),
-                    text=['多' for _ in range(len(buy_signals))],
+                    text=buy_signals['signal_type'].map(SIGNAL_MARKER_TEXTS).to_numpy(),
                     textposition='bottom center',
-                    texttemplate='%{text}',
                     textfont=dict(family="SimHei, Arial", size=12, color="darkgreen", weight="bold"),
-                    hovertemplate='日期: %{x}<br>信号: %{customdata[0]}<extra></extra>',
-                    customdata=buy_signals[['signal_description']].values,
-                    showlegend=True
-                ), row=1, col=1
-            )
-
-        # 强卖出信号（红色，圆形）
-        strong_sell_signals = valid_signals[valid_signals['signal_type'] == 'strong_sell']
-        if not strong_sell_signals.empty:
-            fig.add_trace(
-                go.Scatter(
-                    x=strong_sell_signals['date'],
-                    y=df.loc[strong_sell_signals['date'], 'high'] * 1.05,
-                    mode='markers+text',
-                    name='强卖出信号',
-                    marker=dict(
-                        symbol='circle',
-                        color='red',
-                        size=10,
-                        line=dict(width=1, color='black')
-                    ),
-                    text=['强空' for _ in range(len(strong_sell_signals))],
-                    textposition='top center',
-                    texttemplate='%{text}',
-                    textfont=dict(family="SimHei, Arial", size=12, color="darkred", weight="bold"),
-                    hovertemplate='日期: %{x}<br>信号: %{customdata[0]}<extra></extra>',
-                    customdata=strong_sell_signals[['signal_description']].values,
+                    hovertemplate='日期: %{x}<br>信号: %{customdata}<extra></extra>',
+                    customdata=buy_signals['signal_description'].to_numpy(),
                     showlegend=True
                 ), row=1, col=1
             )
 
-        # 卖出信号（浅红色，圆形）
-        sell_signals = valid_signals[valid_signals['signal_type'] == 'normal_sell']
+        # 卖出信号（强空：红色，空：浅红色，圆形，K线上方）
+        sell_signals = valid_signals.loc[is_sell_signal]
         if not sell_signals.empty:
             fig.add_trace(
                 go.Scatter(
                     x=sell_signals['date'],
-                    y=df.loc[sell_signals['date'], 'high'] * 1.05,
+                    y=signal_y[is_sell_signal],
                     mode='markers+text',
                     name='卖出信号',
                     marker=dict(
                         symbol='circle',
-                        color='lightcoral',
+                        color=sell_signals['signal_type'].map(SIGNAL_MARKER_COLORS).to_numpy(),
                         size=10,
                         line=dict(width=1, color='black')
                     ),
-                    text=['空' for _ in range(len(sell_signals))],
+                    text=sell_signals['signal_type'].map(SIGNAL_MARKER_TEXTS).to_numpy(),
                     textposition='top center',
-                    texttemplate='%{text}',
                     textfont=dict(family="SimHei, Arial", size=12, color="darkred", weight="bold"),
-                    hovertemplate='日期: %{x}<br>信号: %{customdata[0]}<extra></extra>',
-                    customdata=sell_signals[['signal_description']].values,
+                    hovertemplate='日期: %{x}<br>信号: %{customdata}<extra></extra>',
+                    customdata=sell_signals['signal_description'].to_numpy(),
                     showlegend=True
                 ), row=1, col=1
             )
@@ -385,13 +387,19 @@ def create_trading_chart(chart_title_prefix, df, valid_signals, valid_trades, ho
     # 7. 添加实际交易点标记
     # 首先检查valid_trades是否有效
     if valid_trades is not None and not valid_trades.empty and all(col in valid_trades.columns for col in ['date', 'action', 'size']):
+        is_buy_trade = (valid_trades['action'] == 'B').to_numpy()
+        is_sell_trade = (valid_trades['action'] == 'S').to_numpy()
+        # 买入标记在收盘价下方10%，卖出标记在收盘价上方10%
+        trade_pos = df.index.get_indexer(valid_trades['date'])
+        trade_y = close_values[trade_pos] * np.where(is_buy_trade, 0.90, 1.10)
+
         # 买入操作（B，上三角形，绿色，K线下方）
-        buy_trades = valid_trades[valid_trades['action'] == 'B']
+        buy_trades = valid_trades.loc[is_buy_trade]
         if not buy_trades.empty:
             fig.add_trace(
                 go.Scatter(
                     x=buy_trades['date'],
-                    y=df.loc[buy_trades['date'], 'close'] * 0.90,
+                    y=trade_y[is_buy_trade],
                     mode='markers+text',
                     name='买入操作(B)',
                     marker=dict(
@@ -400,22 +408,21 @@ def create_trading_chart(chart_title_prefix, df, valid_signals, valid_trades, ho
                         size=12,
                         line=dict(width=1, color='black')
                     ),
-                    text=['B' for _ in range(len(buy_trades))],
+                    text='B',
                     textposition='bottom center',
-                    texttemplate='%{text}',
                     textfont=dict(family="SimHei, Arial", size=12, color="darkgreen", weight="bold"),
-                    hovertemplate='日期: %{x}<br>操作: 买入(B)<br>数量: %{customdata[0]}股<br>价格: %{y:.2f}<extra></extra>',
-                    customdata=buy_trades[['size']].values
+                    hovertemplate='日期: %{x}<br>操作: 买入(B)<br>数量: %{customdata}股<br>价格: %{y:.2f}<extra></extra>',
+                    customdata=buy_trades['size'].to_numpy()
                 ), row=1, col=1
             )
 
         # 卖出操作（S，下三角形，红色，K线上方）
-        sell_trades = valid_trades[valid_trades['action'] == 'S']
+        sell_trades = valid_trades.loc[is_sell_trade]
         if not sell_trades.empty:
             fig.add_trace(
                 go.Scatter(
                     x=sell_trades['date'],
-                    y=df.loc[sell_trades['date'], 'close'] * 1.10,
+                    y=trade_y[is_sell_trade],
                     mode='markers+text',
                     name='卖出操作(S)',
                     marker=dict(
@@ -424,12 +431,11 @@ def create_trading_chart(chart_title_prefix, df, valid_signals, valid_trades, ho
                         size=12,
                         line=dict(width=1, color='black')
                     ),
-                    text=['S' for _ in range(len(sell_trades))],
+                    text='S',
                     textposition='top center',
-                    texttemplate='%{text}',
                     textfont=dict(family="SimHei, Arial", size=12, color="darkred", weight="bold"),
-                    hovertemplate='日期: %{x}<br>操作: 卖出(S)<br>数量: %{customdata[0]}股<br>价格: %{y:.2f}<extra></extra>',
-                    customdata=sell_trades[['size']].values
+                    hovertemplate='日期: %{x}<br>操作: 卖出(S)<br>数量: %{customdata}股<br>价格: %{y:.2f}<extra></extra>',
+                    customdata=sell_trades['size'].to_numpy()
                 ), row=1, col=1
             )
     else:
@@ -554,11 +560,9 @@ def save_and_show_chart(fig, file_name, output_dir=None):
     else:
         file_path = file_name
 
-    # 保存图表
-    fig.write_html(file_path)
-
-    # 在浏览器中显示图表
-    fig.show()
+    # 保存图表并直接在浏览器中打开该文件，避免 fig.show() 再序列化一次
+    # plotly.js 走 CDN 引用，不再内嵌到 HTML 中
+    fig.write_html(file_path, include_plotlyjs='cdn', auto_open=True)
 
     return file_path
 
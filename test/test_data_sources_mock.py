@@ -31,6 +31,14 @@ class TestDataSourcesMock(unittest.TestCase):
         self.assertFalse(df.empty)
         self.assertIn("volume", df.columns)
 
+    def test_akshare_many_hk_history(self):
+        """akshare 多只港股并发获取，结果顺序与输入一致。"""
+        with patch("core.stock.manager_akshare.get_single_hk_stock_history",
+                   side_effect=lambda code, *args: (True, f"{code}.csv")) as single:
+            results = manager_akshare.get_many_hk_stock_history(["00700", "09988"], "2026-01-01", "2026-01-02")
+        self.assertEqual(results, [(True, "00700.csv"), (True, "09988.csv")])
+        self.assertEqual(single.call_count, 2)
+
     def test_akshare_us_history(self):
         """akshare 美股日线接口。"""
         df = pd.DataFrame({
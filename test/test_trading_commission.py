@@ -0,0 +1,24 @@
+"""
+佣金模型单元测试
+验证向量化手续费计算与逐笔计算一致
+"""
+
+import unittest
+
+import numpy as np
+
+from core.strategy.trading.trading_commition import HKCommission
+
+
+class TestTradingCommission(unittest.TestCase):
+    def test_hk_commission_vec_matches_scalar(self):
+        """港股向量化手续费与逐笔结果一致。"""
+        comm = HKCommission()
+        sizes = np.array([100, -10000, 1, 1000000])
+        prices = np.array([300.0, 5.0, 1.0, 400.0])
+        expected = [comm._getcommission(size, price, pseudoexec=False) for size, price in zip(sizes, prices)]
+        np.testing.assert_allclose(comm.getcommission_vec(sizes, prices), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
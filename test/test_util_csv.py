@@ -0,0 +1,71 @@
+"""
+CSV 写入单元测试
+验证 save_to_csv 的输出与 pandas to_csv 逐字节一致（包括 pyarrow 快速路径与回退路径）
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from common import util_csv
+
+
+def _pandas_bytes(df, path):
+    df.to_csv(path, index=False, encoding='utf-8-sig')
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class TestSaveToCsv(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+
+    def _path(self, name):
+        return os.path.join(self._tmp.name, name)
+
+    def assertMatchesPandas(self, df):
+        util_csv.save_to_csv(df, self._path('out.csv'))
+        with open(self._path('out.csv'), 'rb') as f:
+            written = f.read()
+        self.assertEqual(written, _pandas_bytes(df, self._path('expected.csv')))
+
+    def test_daily_kline_uses_pyarrow_and_matches_pandas(self):
+        """日线K线数据走 pyarrow 路径，输出与 to_csv 一致。"""
+        if util_csv.pa is None:
+            self.skipTest('pyarrow 未安装')
+        df = pd.DataFrame({
+            'date': pd.to_datetime(['2024-01-02', '2024-01-03', None]),
+            'open': [1.0, 0.1 + 0.2, np.nan],
+            'close': np.array([1e-5, 2.5, 1e20], dtype=np.float32),
+            'volume': np.array([100, 0, 123456789], dtype=np.int64),
+            'stock_code': ['00700', None, '09988'],
+            'stock_name': ['腾讯控股', '', '阿里巴巴'],
+        })
+        util_csv._write_csv_pyarrow(df, self._path('fast.csv'))
+        with open(self._path('fast.csv'), 'rb') as f:
+            self.assertEqual(f.read(), _pandas_bytes(df, self._path('expected.csv')))
+        self.assertMatchesPandas(df)
+
+    def test_unsupported_frames_fall_back_to_pandas(self):
+        """带时间/时区的日期、非字符串列名、需要引号的字符串、混合类型列均回退到 pandas。"""
+        frames = [
+            pd.DataFrame({'date': pd.to_datetime(['2024-01-02 09:30:00', '2024-01-02 09:31:00']), 'close': [1.0, 2.0]}),
+            pd.DataFrame({'date': pd.to_datetime(['2024-01-02', '2024-01-03']).tz_localize('Asia/Shanghai'),
+                          'close': [1.0, 2.0]}),
+            pd.DataFrame({0: [1.0, 2.0], 1: ['a', 'b']}),
+            pd.DataFrame({'name': ['Apple, Inc.', 'say "hi"'], 'close': [1.0, 2.0]}),
+            pd.DataFrame({'mixed': ['x', 1], 'close': [1.0, 2.0]}),
+            pd.DataFrame({'flag': [True, False], 'close': [1.0, 2.0]}),
+            pd.DataFrame({'close': [1.0, np.nan]}),
+        ]
+        for df in frames:
+            with self.subTest(columns=list(df.columns)):
+                self.assertMatchesPandas(df)
+
+
+if __name__ == "__main__":
+    unittest.main()
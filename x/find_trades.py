@@ -1,4 +1,5 @@
 import time
+from io import StringIO
 import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -6,7 +7,6 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
 
 def scrape_trades(trade_type='stock', max_pages=0):
     """
@@ -56,7 +56,10 @@ def scrape_trades(trade_type='stock', max_pages=0):
     # 等待页面加载
     time.sleep(5)
 
-    all_data = []
+    # 每页抓取后直接追加写入CSV，不在内存中累积所有页
+    csv_file = None
+    header_columns = None
+    total_rows = 0
     page_num = 1
 
     try:
@@ -68,13 +71,10 @@ def scrape_trades(trade_type='stock', max_pages=0):
                 table_element = driver.find_element(By.ID, target_table_id)
                 table_html = table_element.get_attribute('outerHTML')
 
-                # B. 【新增步骤】使用 BeautifulSoup 剔除 tfoot (翻页条就在这里面)
-                soup = BeautifulSoup(table_html, 'html.parser')
-                if soup.tfoot:
-                    soup.tfoot.decompose()  # 这一刀下去，底部的乱码行就没了
-
-                # C. 读取清洗后的 HTML
-                df_current = pd.read_html(str(soup), header=0)[0]
+                # B. 用 lxml 直接解析一次 (不再经 BeautifulSoup 剔除 tfoot 后二次解析)
+                # tfoot 里的翻页条会被当作数据行读入，交给下面 F 步的日期过滤剔除
+                df_current = pd.read_html(StringIO(table_html), attrs={'id': target_table_id},
+                                          header=0, flavor='lxml')[0]
 
                 # D. 处理多级表头 (MultiIndex)
                 if isinstance(df_current.columns, pd.MultiIndex):
@@ -84,11 +84,21 @@ def scrape_trades(trade_type='stock', max_pages=0):
                 df_current.columns = [str(c).strip() for c in df_current.columns]
 
                 # F. 【双重保险】过滤掉没有日期的行 (防止还有漏网之鱼)
-                # 假设第一列是“开仓时间”，必须包含数字或 '/'
+                # 假设第一列是“开仓时间”，无法解析为日期的行视为无效行
                 first_col = df_current.columns[0]
-                df_current = df_current[df_current[first_col].astype(str).str.len() > 3]
-
-                all_data.append(df_current)
+                open_time = pd.to_datetime(df_current[first_col], errors='coerce', format='mixed', cache=True)
+                df_current = df_current.loc[open_time.notna()]
+
+                # 首页时创建文件并写表头 (utf-8-sig 防止中文乱码)
+                # 后续页按首页列顺序对齐，列顺序不同或缺列时不会错位
+                if csv_file is None:
+                    csv_file = open(target_filename, 'w', encoding='utf-8-sig', newline='')
+                    header_columns = list(df_current.columns)
+                    df_current.to_csv(csv_file, index=False)
+                else:
+                    df_current = df_current.reindex(columns=header_columns)
+                    df_current.to_csv(csv_file, index=False, header=False)
+                total_rows += len(df_current)
                 print(f"✅ 第 {page_num} 页抓取成功，本页 {len(df_current)} 条。")
 
             except Exception as e:
@@ -133,21 +143,13 @@ def scrape_trades(trade_type='stock', max_pages=0):
 
     finally:
         driver.quit()
+        if csv_file is not None:
+            csv_file.close()
 
-    # --- 6. 保存数据 ---
-    if all_data:
-        try:
-            print("正在合并数据...")
-            final_df = pd.concat(all_data, ignore_index=True, sort=False)
-
-            # 保存为 CSV (utf-8-sig 防止中文乱码)
-            final_df.to_csv(target_filename, index=False, encoding='utf-8-sig')
-
-            print(f"🎉 全部完成！共 {len(final_df)} 条数据。")
-            print(f"💾 文件已保存为: {target_filename}")
-
-        except Exception as e:
-            print(f"❌ 保存文件时报错: {e}")
+    # --- 6. 汇总结果 ---
+    if csv_file is not None:
+        print(f"🎉 全部完成！共 {total_rows} 条数据。")
+        print(f"💾 文件已保存为: {target_filename}")
     else:
         print("⚠️ 未获取到任何数据。")
 
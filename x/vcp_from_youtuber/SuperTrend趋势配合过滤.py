@@ -15,7 +15,14 @@ import yfinance as yf
 import pandas as pd
 import pandas_ta as ta
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import datetime
+import os
+from collections import namedtuple
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from vcp_kernels import _supertrend_loop, _wilder_atr_loop
 
 
 # ==========================================
@@ -38,13 +45,59 @@ class StrategyConfig:
     VOLUME_DRYUP_RATIO = 0.75  # 近期成交量需小于均量的 75%
 
 
+# 行情数据统一存为 float32：价格约6位有效数字，阈值均为百分比，精度足够且内存带宽减半
+OHLCV_DTYPES = {col: 'float32' for col in ['Open', 'High', 'Low', 'Close', 'Volume']}
+
+# Supertrend 输出列名固定，不随 ATR 参数变化，避免每次拼接列名字符串
+ST_COL = 'ST'
+ST_DIR_COL = 'ST_DIR'
+
+# 单只股票的K线数据 (SoA)：每个字段为一段连续的 float32 数组
+Bars = namedtuple('Bars', ['open', 'high', 'low', 'close', 'volume'])
+
+# 行情数据本地缓存目录 (Parquet)
+CACHE_DIR = Path.home() / '.cache' / 'vcp'
+
+
 # ==========================================
 # 2. 数据获取模块
 # ==========================================
+def _get_cache_path(ticker, start_date, end_date):
+    """生成缓存文件路径：按代码与起止日期命名，同一天内的重复扫描命中同一文件"""
+    # 清理Ticker名称中的特殊字符（如 ^GSPC -> GSPC）
+    safe_ticker = ticker.replace('^', '').replace('.', '_')
+    return CACHE_DIR / f"{safe_ticker}_{start_date:%Y%m%d}_{end_date:%Y%m%d}.parquet"
+
+
+def _read_cache(ticker, start_date, end_date):
+    """读取本地 Parquet 缓存，不存在或读取失败时返回 None"""
+    cache_path = _get_cache_path(ticker, start_date, end_date)
+    if not cache_path.exists():
+        return None
+    try:
+        return pd.read_parquet(cache_path)
+    except Exception as e:
+        print(f"Cache read error for {ticker}: {e}")
+        return None
+
+
+def _write_cache(ticker, start_date, end_date, df):
+    """将下载结果写入本地 Parquet 缓存 (zstd 压缩)"""
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        df.to_parquet(_get_cache_path(ticker, start_date, end_date), compression='zstd')
+    except Exception as e:
+        print(f"Cache write error for {ticker}: {e}")
+
+
 def fetch_stock_data(ticker, start_date, end_date):
     """
-    从 Yahoo Finance 获取历史数据，并处理 MultiIndex 问题
+    从 Yahoo Finance 获取历史数据，并处理 MultiIndex 问题（优先读取本地缓存）
     """
+    df = _read_cache(ticker, start_date, end_date)
+    if df is not None:
+        return df
+
     try:
         # progress=False 禁用进度条以保持输出整洁
         df = yf.download(ticker, start=start_date, end=end_date, progress=False)
@@ -61,76 +114,155 @@ def fetch_stock_data(ticker, start_date, end_date):
         if not all(col in df.columns for col in required_cols):
             return None
 
+        df = df.astype(OHLCV_DTYPES)
+        _write_cache(ticker, start_date, end_date, df)
         return df
     except Exception as e:
         print(f"Error fetching {ticker}: {e}")
         return None
 
 
-# ==========================================
-# 3. 指标计算模块 (Supertrend & Moving Averages)
-# ==========================================
-def calculate_indicators(df, config):
+def fetch_many_stock_data(ticker_list, start_date, end_date):
     """
-    计算技术指标：Supertrend, SMA, ATR, Relative Volume
+    一次批量下载多只股票（yfinance 内部多线程），按代码拆分为单独的数据帧
+    已有本地缓存的代码直接读取缓存，只下载缺失部分
+    返回: {ticker: df}，下载失败或缺列的代码不在其中
     """
-    df = df.copy()
+    frames = {}
+    missing_tickers = []
+    for ticker in ticker_list:
+        df = _read_cache(ticker, start_date, end_date)
+        if df is None:
+            missing_tickers.append(ticker)
+        else:
+            frames[ticker] = df
 
-    # 3.1 计算 Supertrend
-    # pandas_ta 的 supertrend 函数返回三列：值、方向(1/-1)、及其他
-    # 动态获取列名以避免硬编码错误
-    st = df.ta.supertrend(length=config.ATR_PERIOD, multiplier=config.ATR_MULTIPLIER)
+    if not missing_tickers:
+        return frames
 
-    if st is None:
-        return df
+    required_cols = ['Open', 'High', 'Low', 'Close', 'Volume']
+    try:
+        data = yf.download(missing_tickers, start=start_date, end=end_date,
+                           group_by='ticker', threads=True, progress=False)
+    except Exception as e:
+        print(f"Error fetching {len(missing_tickers)} tickers: {e}")
+        return frames
+
+    if data.empty:
+        return frames
+
+    for ticker in missing_tickers:
+        # group_by='ticker' 时列为 (ticker, 'Close') 形式的 MultiIndex
+        if isinstance(data.columns, pd.MultiIndex):
+            if ticker not in data.columns.get_level_values(0):
+                continue
+            df = data.xs(ticker, level=0, axis=1)
+        else:
+            df = data
+        # 批量结果按所有股票的日期并集对齐，去掉该股票没有数据的行
+        df = df.dropna(how='all')
+        if df.empty or not all(col in df.columns for col in required_cols):
+            continue
+        df = df.astype(OHLCV_DTYPES)
+        # 按代码分别缓存，下次扫描可单独命中
+        _write_cache(ticker, start_date, end_date, df)
+        frames[ticker] = df
+    return frames
 
-    # 重命名列以方便后续调用
-    # pandas_ta 默认列名格式示例: SUPERT_10_3.0, SUPERTd_10_3.0
-    st_val_col = f"SUPERT_{config.ATR_PERIOD}_{config.ATR_MULTIPLIER}"
-    st_dir_col = f"SUPERTd_{config.ATR_PERIOD}_{config.ATR_MULTIPLIER}"
 
-    df = st[st_val_col]
-    df = st[st_dir_col]  # 1 为看涨(绿), -1 为看跌(红)
+# ==========================================
+# 3. 指标计算模块 (Supertrend & Moving Averages)
+# ==========================================
+def _sma(values, lengths):
+    """
+    简单移动平均：多个周期共用同一次累加和，总计 O(N)
+    返回与 lengths 一一对应的数组列表，每个数组前 length-1 个位置为 NaN
+    """
+    # 累加在 float64 中进行，避免 float32 输入的误差累积
+    csum = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+    averages = []
+    for length in lengths:
+        out = np.full(len(values), np.nan)
+        if len(values) >= length:
+            out[length - 1:] = (csum[length:] - csum[:-length]) / length
+        averages.append(out)
+    return averages
+
+
+def _atr(high, low, close, length):
+    """Wilder ATR：真实波幅 (TR) 的 RMA，alpha = 1/length"""
+    prev_close = np.empty_like(close)
+    prev_close[0] = np.nan
+    prev_close[1:] = close[:-1]
+    # fmax 忽略 NaN，首根K线的 TR 即为 high - low
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return _wilder_atr_loop(tr, length)
+
+
+def _df_to_bars(df):
+    """
+    将 OHLCV DataFrame 转为 Bars：每个字段单独复制为可写、C 连续的 float32 数组，
+    递推内核逐K线读取时不跨步，后续扫描全程不再经过 pandas。
+    float32 列的 to_numpy() 是只读视图 (Copy-on-Write)，numba 的 float32[:] 签名不接受，必须复制
+    """
+    return Bars(*(np.array(df[col].to_numpy(), dtype=np.float32, order='C', copy=True)
+                  for col in ['Open', 'High', 'Low', 'Close', 'Volume']))
+
 
-    # 3.2 计算 趋势均线 (Stage 2 过滤)
-    df = ta.sma(df['Close'], length=50)
-    df = ta.sma(df['Close'], length=150)
-    df = ta.sma(df['Close'], length=200)
+def calculate_indicators(bars, config):
+    """
+    计算技术指标：Supertrend, SMA, ATR, Relative Volume
+    返回: {指标名: 与 bars 等长的 ndarray}
+    """
+    high, low, close, volume = bars.high, bars.low, bars.close, bars.volume
 
-    # 3.3 计算 波动率参考 (ATR)
-    df = ta.atr(df['High'], df['Low'], df['Close'], length=14)
-    df = ta.atr(df['High'], df['Low'], df['Close'], length=5)  # 短期波动
+    # 3.1 计算 Supertrend（递推逻辑见 vcp_kernels，安装 numba 时编译执行）
+    st_atr = _atr(high, low, close, config.ATR_PERIOD)
+    supertrend, direction = _supertrend_loop(high, low, close, st_atr, config.ATR_MULTIPLIER)
 
-    # 3.4 计算 成交量均线
-    df = ta.sma(df['Volume'], length=50)
+    # 3.2 计算 趋势均线 (Stage 2 过滤)，三条均线由同一次累加和得到
+    sma_50, sma_150, sma_200 = _sma(close, (50, 150, 200))
 
-    return df
+    return {
+        ST_COL: supertrend,
+        ST_DIR_COL: direction,  # 1 为看涨(绿), -1 为看跌(红)
+        'SMA_50': sma_50,
+        'SMA_150': sma_150,
+        'SMA_200': sma_200,
+        # 3.3 计算 波动率参考 (ATR)
+        'ATR_14': _atr(high, low, close, 14),
+        'ATR_5': _atr(high, low, close, 5),  # 短期波动
+        # 3.4 计算 成交量均线
+        'Vol_MA50': _sma(volume, (50,))[0],
+    }
 
 
 # ==========================================
 # 4. 核心逻辑：VCP形态识别算法
 # ==========================================
-def check_vcp_setup(df, config):
+def check_vcp_setup(bars, indicators, config):
     """
-    分析数据帧，判断是否满足 VCP + Supertrend 的双重条件
+    分析K线与指标，判断最新一根K线是否满足 VCP + Supertrend 的双重条件
     返回: (Boolean, String_Reason)
     """
+    high, low, close, volume = bars.high, bars.low, bars.close, bars.volume
+
     # 确保数据长度足够
-    if len(df) < 200:
+    if len(close) < 200:
         return False, "数据不足"
 
-    curr = df.iloc[-1]
+    curr_close = close[-1]
 
     # ---------------------------
     # 步骤 1: 趋势过滤 (Supertrend & SMA)
     # ---------------------------
 
     # Supertrend 必须为看涨 (1)
-    if curr != 1:
+    if indicators[ST_DIR_COL][-1] != 1:
         return False, "Supertrend为看跌状态"
 
     # 价格需位于 200日均线之上 (米勒维尼 Stage 2 基础)
-    if not (curr['Close'] > curr):
+    if not (curr_close > indicators['SMA_200'][-1]):
         return False, "价格低于200日均线"
 
     # ---------------------------
@@ -144,15 +276,13 @@ def check_vcp_setup(df, config):
     window_short = 30
 
     # 过去60-30天的波幅 (Swing 1)
-    period_1 = df.iloc[-window_long:-window_short]
-    high_1 = period_1['High'].max()
-    low_1 = period_1['Low'].min()
+    high_1 = high[-window_long:-window_short].max()
+    low_1 = low[-window_long:-window_short].min()
     volatility_1 = (high_1 - low_1) / low_1
 
     # 过去30-0天的波幅 (Swing 2)
-    period_2 = df.iloc[-window_short:]
-    high_2 = period_2['High'].max()
-    low_2 = period_2['Low'].min()
+    high_2 = high[-window_short:].max()
+    low_2 = low[-window_short:].min()
     volatility_2 = (high_2 - low_2) / low_2
 
     # 检查波动率是否收缩 (后一波段波幅 < 前一波段 * 容忍度)
@@ -164,17 +294,16 @@ def check_vcp_setup(df, config):
     # ---------------------------
 
     # 检查最近5天的紧凑程度
-    recent_5 = df.iloc[-5:]
-    avg_range_5 = (recent_5['High'] - recent_5['Low']).mean()
+    avg_range_5 = (high[-5:] - low[-5:]).mean()
 
     # 如果最近5天平均波幅 < 0.6 * 14天ATR，视为"紧凑"
-    if avg_range_5 > (curr * 0.8):  # 放宽一点便于演示
+    if avg_range_5 > (indicators['ATR_14'][-1] * 0.8):  # 放宽一点便于演示
         return False, "近期价格不够紧凑 (Not Tight)"
 
     # 检查成交量枯竭
     # 最近5天平均成交量 < 50日均量的 75%
-    recent_vol_avg = recent_5['Volume'].mean()
-    if recent_vol_avg > (curr * config.VOLUME_DRYUP_RATIO):
+    recent_vol_avg = volume[-5:].mean()
+    if recent_vol_avg > (indicators['Vol_MA50'][-1] * config.VOLUME_DRYUP_RATIO):
         return False, "成交量未枯竭"
 
     # ---------------------------
@@ -182,16 +311,103 @@ def check_vcp_setup(df, config):
     # ---------------------------
 
     # 收盘价应接近近期高点 (准备突破)
-    dist_to_high = (high_2 - curr['Close']) / curr['Close']
+    dist_to_high = (high_2 - curr_close) / curr_close
     if dist_to_high > 0.05:  # 距离高点超过5%，可能还在调整底部
         return False, "距离突破点过远"
 
     return True, "VCP Setup Detected"
 
 
+def _window_reduce(values, window, reducer):
+    """
+    以每根K线为窗口终点做 window 根的归约 (基于 sliding_window_view，不复制数据)
+    返回与输入等长的数组，头部不足一个窗口处为 NaN
+    """
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        out[window - 1:] = reducer(sliding_window_view(values, window), axis=1)
+    return out
+
+
+def check_vcp_setup_vectorized(bars, indicators, config):
+    """
+    check_vcp_setup 的全历史版本：对每一根K线判断是否满足 VCP + Supertrend 条件，
+    判定规则与 check_vcp_setup 在该K线上的结果一致，可用于历史信号回测
+    返回: 与 bars 等长的布尔数组
+    """
+    window_long = 60
+    window_short = 30
+
+    high = bars.high.astype(np.float64)
+    low = bars.low.astype(np.float64)
+    close = bars.close.astype(np.float64)
+    volume = bars.volume.astype(np.float64)
+    n = len(close)
+
+    # 最近30天的波幅 (Swing 2)；前60-30天的波幅 (Swing 1) 即其向后平移30根
+    high_2 = _window_reduce(high, window_short, np.max)
+    low_2 = _window_reduce(low, window_short, np.min)
+    volatility_2 = (high_2 - low_2) / low_2
+    volatility_1 = np.full(n, np.nan)
+    volatility_1[window_long - window_short:] = volatility_2[:n - (window_long - window_short)]
+
+    # 最近5天的平均振幅与平均成交量
+    avg_range_5 = _window_reduce(high - low, 5, np.mean)
+    recent_vol_avg = _window_reduce(volume, 5, np.mean)
+    dist_to_high = (high_2 - close) / close
+
+    # 各条件取 check_vcp_setup 中“淘汰条件”的否定，保证 NaN 情况下结果一致
+    with np.errstate(invalid='ignore'):
+        return (
+            (np.arange(n) >= 199)  # 数据不足
+            & (indicators[ST_DIR_COL] == 1)
+            & (close > indicators['SMA_200'])
+            & ~(volatility_2 >= volatility_1 * config.CONTRACTION_TOLERANCE)
+            & ~(avg_range_5 > indicators['ATR_14'] * 0.8)
+            & ~(recent_vol_avg > indicators['Vol_MA50'] * config.VOLUME_DRYUP_RATIO)
+            & ~(dist_to_high > 0.05)
+        )
+
+
 # ==========================================
 # 5. 主程序：批量扫描
 # ==========================================
+def _scan_one(ticker, bars, config):
+    """
+    单只股票的扫描任务（在子进程中执行，需为模块顶层函数以便 pickle）
+    返回: 命中时为 (reason, 结果行)，否则为 None
+    """
+    # 先做 O(1) 的廉价过滤，尽量在计算全部指标之前淘汰
+    close = bars.close
+    volume = bars.volume
+
+    # 基础过滤 (价格/流动性)
+    if close[-1] < config.MIN_PRICE:
+        return None
+    if volume[-1] * close[-1] < 1000000:  # 简单成交额过滤
+        return None
+
+    # 趋势预过滤：数据不足200天或收盘价不在200日均线之上，check_vcp_setup 必然不通过
+    if len(close) < 200 or not (close[-1] > close[-200:].mean()):
+        return None
+
+    # 计算指标
+    indicators = calculate_indicators(bars, config)
+
+    # 检查策略逻辑
+    is_match, reason = check_vcp_setup(bars, indicators, config)
+    if not is_match:
+        return None
+
+    return reason, {
+        'Ticker': ticker,
+        'Close': float(close[-1]),
+        'Supertrend': float(indicators[ST_COL][-1]),
+        'ATR': float(indicators['ATR_14'][-1]),
+        'Volume_Ratio': float(volume[-1] / indicators['Vol_MA50'][-1])
+    }
+
+
 def run_scanner(ticker_list):
     print(f"开始扫描 {len(ticker_list)} 只股票...")
     print(f"策略: Supertrend({StrategyConfig.ATR_PERIOD}, {StrategyConfig.ATR_MULTIPLIER}) + VCP")
@@ -199,32 +415,27 @@ def run_scanner(ticker_list):
     end_date = datetime.datetime.now()
     start_date = end_date - datetime.timedelta(days=365)  # 获取1年数据
 
-    results =
-
-    for ticker in ticker_list:
-        # 1. 获取数据
-        df = fetch_stock_data(ticker, start_date, end_date)
-        if df is None: continue
-
-        # 2. 基础过滤 (价格/流动性)
-        if df['Close'].iloc[-1] < StrategyConfig.MIN_PRICE: continue
-        if df['Volume'].iloc[-1] * df['Close'].iloc[-1] < 1000000: continue  # 简单成交额过滤
-
-        # 3. 计算指标
-        df = calculate_indicators(df, StrategyConfig)
-
-        # 4. 检查策略逻辑
-        is_match, reason = check_vcp_setup(df, StrategyConfig)
-
-        if is_match:
-            print(f"[发现目标] {ticker}: {reason}")
-            results.append({
-                'Ticker': ticker,
-                'Close': df['Close'].iloc[-1],
-                'Supertrend': df.iloc[-1],
-                'ATR': df.iloc[-1],
-                'Volume_Ratio': df['Volume'].iloc[-1] / df.iloc[-1]
-            })
+    results = []
+
+    # 1. 批量获取数据：N 次网络请求合并为 1 次
+    frames = fetch_many_stock_data(ticker_list, start_date, end_date)
+
+    # 2. 指标计算与形态判定分发到多进程并行执行
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        # 传给子进程的是 Bars 数组，而不是 DataFrame
+        futures = [executor.submit(_scan_one, ticker, _df_to_bars(df), StrategyConfig)
+                   for ticker, df in frames.items()]
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"扫描失败: {e}")
+                continue
+            if result is None:
+                continue
+            reason, row = result
+            print(f"[发现目标] {row['Ticker']}: {reason}")
+            results.append(row)
 
     # 输出结果表格
     if results:
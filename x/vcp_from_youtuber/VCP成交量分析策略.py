@@ -2,6 +2,8 @@ import yfinance as yf
 import pandas as pd
 import numpy as np
 
+from vcp_kernels import _move_max, _move_mean, _move_std
+
 
 # 1. 获取数据函数
 def get_data(ticker_symbol):
@@ -39,20 +41,22 @@ def analyze_volume_contraction(df, method=1, x_days=7, y_param=0.3, z_threshold=
     :param y_param: 百分比参数 (Y%)，用于方法1和3
     :param z_threshold: Z-score 阈值，用于方法2
     """
-    df = df.copy()
+    # 成交量一次取出为 ndarray，滚动统计与筛选条件都在数组上完成
+    volume = df['Volume'].to_numpy(dtype=np.float64)
 
     # 预先计算未来回报，方便查看结果
-    df = get_future_return(df)
+    # 新增列写入只含 Close 的小表，不再整表 copy 原始数据
+    extra = get_future_return(df[['Close']].copy()).drop(columns='Close')
 
     if method == 1:
         # 方法一：低于过去 X 日平均成交量 Y%
         # 逻辑：Current Volume < Moving Average(X) * (1 - Y)
 
         col_name = f'Vol_MA_{x_days}'
-        df[col_name] = df['Volume'].rolling(window=x_days).mean()
+        extra[col_name] = _move_mean(volume, x_days)
 
         # 筛选条件
-        condition = df['Volume'] < (df[col_name] * (1 - y_param))
+        condition = volume < (extra[col_name].to_numpy() * (1 - y_param))
 
         print(f"--- 方法一分析 (低于 {x_days} 日均量 {y_param * 100}%) ---")
 
@@ -61,14 +65,15 @@ def analyze_volume_contraction(df, method=1, x_days=7, y_param=0.3, z_threshold=
         # 逻辑：(Current Volume - Mean) / Std Dev < Threshold
 
         # 计算滚动平均值和滚动标准差
-        rolling_mean = df['Volume'].rolling(window=x_days).mean()
-        rolling_std = df['Volume'].rolling(window=x_days).std()
+        rolling_mean = _move_mean(volume, x_days)
+        rolling_std = _move_std(volume, x_days)
 
         # 计算 Z-score
-        df['Vol_Zscore'] = (df['Volume'] - rolling_mean) / rolling_std
+        z_score = (volume - rolling_mean) / rolling_std
+        extra['Vol_Zscore'] = z_score
 
         # 筛选条件
-        condition = df['Vol_Zscore'] < z_threshold
+        condition = z_score < z_threshold
 
         print(f"--- 方法二分析 (Z-score < {z_threshold}, 窗口 {x_days} 日) ---")
 
@@ -77,10 +82,10 @@ def analyze_volume_contraction(df, method=1, x_days=7, y_param=0.3, z_threshold=
         # 逻辑：Current Volume < Max_Volume_in_last_X_days * (1 - Y)
 
         col_name = f'MaxVol_{x_days}'
-        df[col_name] = df['Volume'].rolling(window=x_days).max()
+        extra[col_name] = _move_max(volume, x_days)
 
         # 筛选条件
-        condition = df['Volume'] < (df[col_name] * (1 - y_param))
+        condition = volume < (extra[col_name].to_numpy() * (1 - y_param))
 
         print(f"--- 方法三分析 (较 {x_days} 日最高量下跌 {y_param * 100}%) ---")
 
@@ -88,8 +93,8 @@ def analyze_volume_contraction(df, method=1, x_days=7, y_param=0.3, z_threshold=
         print("无效的方法编号")
         return None
 
-    # 提取满足条件的行
-    result_df = df[condition].dropna()
+    # 提取满足条件的行（只对命中的行拼接原始列与新增列）
+    result_df = pd.concat([df.loc[condition], extra.loc[condition]], axis=1).dropna()
 
     # 输出统计结果 (Describe)
     print(f"满足条件的天数: {len(result_df)}")
@@ -17,6 +17,8 @@ import yfinance as yf
 import mplfinance as mpf
 import datetime
 
+from vcp_kernels import _move_max, _vcp_volume
+
 
 def fetch_stock_data(ticker, period="2y", interval="1d"):
     """
@@ -59,22 +61,21 @@ def identify_vcp_setup(df):
     # 定义趋势条件:
     # 1. 股价高于 200 日均线 (长期上升趋势)
     # 2. 股价高于 50 日均线 (中期上升趋势) - 可选
-    condition_trend = df['Close'] > df['Price_MA200']
+    close = df['Close'].to_numpy(dtype=np.float64)
+    condition_trend = close > df['Price_MA200'].to_numpy()
 
     # 定义成交量条件:
     # 连续 3 天成交量低于 MA50
-    condition_vol = df
+    condition_vol = df['Vol_Dry_Consecutive'].to_numpy()
 
     # 定义价格波动收缩 (Price Contraction) 的简化逻辑:
     # 过去 3 天的振幅 (High - Low) / Close 处于极低水平 (例如小于 3%)
     # 这也是视频中隐含的"Tight"概念
-    df = (df['High'] - df['Low']) / df['Close']
-    df = df.rolling(window=3).max() < 0.03
-
-    # 综合信号
-    df = condition_trend & condition_vol & df
+    day_range = (df['High'].to_numpy(dtype=np.float64) - df['Low'].to_numpy(dtype=np.float64)) / close
+    condition_tight = _move_max(day_range, 3) < 0.03
 
-    return df
+    # 综合信号：一次归约合并三个布尔数组，不产生中间的布尔 Series
+    return df.assign(VCP_Signal=np.logical_and.reduce([condition_trend, condition_vol, condition_tight]))
 
 
 def analyze_vcp_volume(df, ma_window=50, tight_window=3):
@@ -87,51 +88,29 @@ def analyze_vcp_volume(df, ma_window=50, tight_window=3):
         tight_window (int): 判定连续缩量的窗口 (默认 3天)
 
     返回:
-        pd.DataFrame: 包含分析指标的新 DataFrame
+        pd.DataFrame: 包含分析指标的新 DataFrame (保留原有索引与列，指标列追加在后，不修改传入的 df)
     """
-    data = df.copy()
-
-    # ==============================================================================
-    # 1. 基础指标计算
-    # ==============================================================================
-    # 计算 50日成交量均线
-    data['Vol_MA50'] = data['Volume'].rolling(window=ma_window).mean()
-
-    # 计算 200日价格均线 (用于趋势过滤，Minervini 强调 VCP 需在上升趋势中)
-    data['Price_MA200'] = data['Close'].rolling(window=200).mean()
-
-    # ==============================================================================
-    # 2. 视频逻辑一：绝对量收缩 (Absolute Contraction)
-    # 逻辑：今日成交量 < 昨日成交量
-    # ==============================================================================
-    data = data['Volume'] < data['Volume'].shift(1)
-
-    # ==============================================================================
-    # 3. 视频逻辑二：相对均线收缩 (Below Average)
-    # 逻辑：今日成交量 < 50日成交量均线
-    # ==============================================================================
-    data = data['Volume'] < data['Vol_MA50']
-
-    # ==============================================================================
-    # 4. 视频逻辑三：滚动窗口内的持续紧缩 (Tightness / Dry-Up)
-    # 逻辑：在过去 N 天内，每天的成交量都低于 50日均线
-    # 技术点：使用 rolling().min() 或 rolling().apply()
-    # ==============================================================================
-    # 由于 'Vol_Below_MA50' 是布尔值 (True=1, False=0)
-    # 我们可以计算滚动窗口内的最小值。如果最小值为 1，说明窗口内全是 1 (即全是 True)
-    data = (
-        data
-        .rolling(window=tight_window)
-        .min()
-    ).fillna(0).astype(bool)
-
-    # ==============================================================================
-    # 5. 增强逻辑：极度枯竭 (Extreme Dry-Up)
-    # 逻辑：今日成交量 < 50日均线的 50% (更加严格的筛选)
-    # ==============================================================================
-    data = data['Volume'] < (data['Vol_MA50'] * 0.5)
-
-    return data
+    # 四类成交量信号与两条均线在 vcp_kernels._vcp_volume 中一次遍历完成
+    # (安装 numba 时编译执行)，逻辑与视频中的三种判定方式一致：
+    # 1. 绝对量收缩 (Absolute Contraction)：今日成交量 < 昨日成交量
+    # 2. 相对均线收缩 (Below Average)：今日成交量 < 50日成交量均线
+    # 3. 持续紧缩 (Tightness / Dry-Up)：连续 N 天成交量都低于 50日均线
+    # 4. 极度枯竭 (Extreme Dry-Up)：今日成交量 < 50日均线的 50%
+    # 另计算 200日价格均线 (用于趋势过滤，Minervini 强调 VCP 需在上升趋势中)
+    volume = df['Volume'].to_numpy(dtype=np.float64)
+    close = df['Close'].to_numpy(dtype=np.float64)
+    vol_ma, price_ma, contraction, below_ma, dry_consecutive, extreme_dry = _vcp_volume(
+        volume, close, ma_window, tight_window, 200)
+
+    # 一次 assign 追加全部指标列，代替先整表 copy 再逐列写入
+    return df.assign(
+        Vol_MA50=vol_ma,
+        Price_MA200=price_ma,
+        Vol_Contraction=contraction,
+        Vol_Below_MA50=below_ma,
+        Vol_Dry_Consecutive=dry_consecutive,
+        Vol_Extreme_Dry=extreme_dry,
+    )
 
 def plot_vcp_analysis(df, ticker_name):
     """
@@ -142,12 +121,8 @@ def plot_vcp_analysis(df, ticker_name):
 
     # 创建信号标记
     # 我们将在满足 VCP_Signal 的那一天，在最低价下方画一个紫色三角形
-    signal_points =[]
-    for date, row in plot_data.iterrows():
-        if row:
-            signal_points.append(row['Low'] * 0.98)  # 标记在最低价下方 2% 处
-        else:
-            signal_points.append(np.nan)
+    # 标记在最低价下方 2% 处，无信号的日期为 NaN (不绘制)
+    signal_points = np.where(plot_data['VCP_Signal'].to_numpy(), plot_data['Low'].to_numpy() * 0.98, np.nan)
 
     apd = [
         mpf.make_addplot(plot_data['Vol_MA50'], panel=1, color='orange', width=1.5),  # 成交量均线
@@ -0,0 +1,361 @@
+"""
+VCP 扫描用的逐K线递推指标内核 (ATR / Supertrend / 成交量枯竭)
+
+这类指标的当前值依赖上一根K线的结果，无法直接向量化，
+因此写成 numpy 数组上的显式循环，交给 numba 编译为机器码。
+输入须为 C 连续的一维数组 (每个字段单独一段连续内存)，不要传入 DataFrame 列的跨步视图。
+注意：输入头部含 NaN (ATR 预热期)，不能开启 fastmath，否则 NaN 比较的语义会被破坏。
+另附滚动窗口统计 _move_mean / _move_std / _move_max，供成交量分析脚本共用。
+"""
+import numpy as np
+import pandas as pd
+
+try:
+    # 可选依赖：滚动窗口统计的单趟 C 实现
+    import bottleneck as bn
+except ImportError:
+    bn = None
+
+try:
+    from numba import njit
+    # 未安装 bottleneck 时，pandas 滚动统计可改用 numba 引擎执行
+    ROLLING_ENGINE = 'numba'
+except ImportError:
+    ROLLING_ENGINE = 'cython'
+
+    # 未安装 numba 时退化为普通 Python 函数（结果一致，只是更慢）
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+def _move_mean(values, window):
+    """滚动均值 (窗口不足时为 NaN)"""
+    if bn is not None:
+        return bn.move_mean(values, window)
+    return pd.Series(values).rolling(window=window).mean(engine=ROLLING_ENGINE).to_numpy()
+
+
+def _move_std(values, window):
+    """滚动样本标准差 (ddof=1，窗口不足时为 NaN)"""
+    if bn is not None:
+        return bn.move_std(values, window, ddof=1)
+    return pd.Series(values).rolling(window=window).std(engine=ROLLING_ENGINE).to_numpy()
+
+
+def _move_max(values, window):
+    """滚动最大值 (窗口不足时为 NaN)"""
+    if bn is not None:
+        return bn.move_max(values, window)
+    return pd.Series(values).rolling(window=window).max(engine=ROLLING_ENGINE).to_numpy()
+
+
+@njit('float32[:](float32[:], int64)', cache=True)
+def _wilder_atr_loop(tr, length):
+    """
+    Wilder 平滑 (RMA)：atr[i] = atr[i-1] + (tr[i] - atr[i-1]) / length
+    与 ewm(alpha=1/length, adjust=False, min_periods=length) 一致，前 length-1 个位置为 NaN
+    输入输出为 float32，递推累加在 float64 中进行以避免误差累积
+    """
+    n = len(tr)
+    atr = np.full(n, np.nan, dtype=np.float32)
+    if n == 0:
+        return atr
+    alpha = 1.0 / length
+    value = np.float64(tr[0])
+    if length <= 1:
+        atr[0] = value
+    for i in range(1, n):
+        value = value + alpha * (tr[i] - value)
+        if i >= length - 1:
+            atr[i] = value
+    return atr
+
+
+@njit('Tuple((float32[:], int8[:]))(float32[:], float32[:], float32[:], float32[:], float32)', cache=True)
+def _supertrend_loop(high, low, close, atr, multiplier):
+    """
+    Supertrend 递推（与 pandas_ta.supertrend 的循环逻辑一致）
+    返回: (supertrend 值, 方向)，方向 1 为看涨，-1 为看跌
+    """
+    n = len(close)
+    trend = np.full(n, np.nan, dtype=np.float32)
+    direction = np.ones(n, dtype=np.int8)
+    upper = (high + low) / 2 + multiplier * atr
+    lower = (high + low) / 2 - multiplier * atr
+
+    for i in range(1, n):
+        if close[i] > upper[i - 1]:
+            direction[i] = 1
+        elif close[i] < lower[i - 1]:
+            direction[i] = -1
+        else:
+            direction[i] = direction[i - 1]
+            # 趋势延续时，支撑/压力带只能朝趋势方向移动
+            if direction[i] > 0 and lower[i] < lower[i - 1]:
+                lower[i] = lower[i - 1]
+            if direction[i] < 0 and upper[i] > upper[i - 1]:
+                upper[i] = upper[i - 1]
+
+        trend[i] = lower[i] if direction[i] > 0 else upper[i]
+
+    return trend, direction
+
+
+@njit(cache=True)
+def _rolling_mean_loop(values, window):
+    """滑动求和的滚动均值，O(n)；窗口不足时为 NaN"""
+    n = len(values)
+    out = np.full(n, np.nan)
+    total = 0.0
+    for i in range(n):
+        total += values[i]
+        if i >= window:
+            total -= values[i - window]
+        if i >= window - 1:
+            out[i] = total / window
+    return out
+
+
+@njit(cache=True)
+def _vcp_volume(volume, close, ma_window, tight_window, trend_window):
+    """
+    一次遍历成交量序列，同时得到 VCP 成交量分析的全部指标
+    返回: (成交量均线, 价格均线, 绝对缩量, 低于均量, 连续低于均量, 极度枯竭)
+    """
+    n = len(volume)
+    vol_ma = _rolling_mean_loop(volume, ma_window)
+    price_ma = _rolling_mean_loop(close, trend_window)
+
+    contraction = np.zeros(n, dtype=np.bool_)
+    below_ma = np.zeros(n, dtype=np.bool_)
+    dry_consecutive = np.zeros(n, dtype=np.bool_)
+    extreme_dry = np.zeros(n, dtype=np.bool_)
+
+    # 连续低于均量的天数，达到 tight_window 即视为持续紧缩
+    streak = 0
+    for i in range(n):
+        if i > 0:
+            contraction[i] = volume[i] < volume[i - 1]
+        # 均线预热期为 NaN，比较结果为 False
+        below_ma[i] = volume[i] < vol_ma[i]
+        extreme_dry[i] = volume[i] < vol_ma[i] * 0.5
+        if below_ma[i]:
+            streak += 1
+        else:
+            streak = 0
+        dry_consecutive[i] = streak >= tight_window
+
+    return vol_ma, price_ma, contraction, below_ma, dry_consecutive, extreme_dry
+
+
+@njit('Tuple((float32[:], boolean[:]))(float32[:], float32[:], float32[:], int64, float64)', cache=True, nogil=True)
+def _supertrend_bands_loop(high, low, close, period, multiplier):
+    """
+    Supertrend 最终上下轨递推 (Minervini 筛选器使用的版本)
+    TR 逐根就地计算，ATR 为 Wilder 平滑：前 period 根取均值预热，之后 atr = (atr*(period-1) + tr) / period
+    输入与 supertrend 输出为 float32，ATR 与上下轨在 float64 中递推
+    返回: (supertrend 值, 是否处于上升趋势)；前 period 根保持初始值 0 / False
+    """
+    n = len(close)
+    final_upper = np.zeros(n)
+    final_lower = np.zeros(n)
+    supertrend = np.zeros(n, dtype=np.float32)
+    in_uptrend = np.zeros(n, dtype=np.bool_)
+
+    atr = 0.0
+    for i in range(n):
+        # True Range：首根K线没有前收盘价，退化为 high - low
+        tr = np.float64(high[i]) - low[i]
+        if i > 0:
+            tr = max(tr, abs(np.float64(high[i]) - close[i - 1]), abs(np.float64(low[i]) - close[i - 1]))
+
+        if i < period:
+            atr += tr / period
+            continue
+        atr = (atr * (period - 1) + tr) / period
+
+        hl2 = (np.float64(high[i]) + low[i]) / 2
+        basic_upper = hl2 + multiplier * atr
+        basic_lower = hl2 - multiplier * atr
+
+        # Final Upper
+        if basic_upper < final_upper[i - 1] or close[i - 1] > final_upper[i - 1]:
+            final_upper[i] = basic_upper
+        else:
+            final_upper[i] = final_upper[i - 1]
+
+        # Final Lower
+        if basic_lower > final_lower[i - 1] or close[i - 1] < final_lower[i - 1]:
+            final_lower[i] = basic_lower
+        else:
+            final_lower[i] = final_lower[i - 1]
+
+        # Trend
+        if in_uptrend[i - 1]:  # Was Up
+            in_uptrend[i] = not (close[i] < final_lower[i])
+        else:  # Was Down
+            in_uptrend[i] = close[i] > final_upper[i]
+
+        supertrend[i] = final_lower[i] if in_uptrend[i] else final_upper[i]
+
+    return supertrend, in_uptrend
+
+
+@njit('float64[:](float32[:], int64)', cache=True, nogil=True)
+def _rsi_sma_loop(close, period):
+    """
+    简单移动平均版 RSI：涨跌幅各自做 period 窗口滑动求和，O(n)
+    与 gain/loss 经 rolling(period).mean() 的写法一致 (首根K线涨跌记为 0)，窗口不足时为 NaN
+    输入为 float32 收盘价，涨跌幅与滑动求和在 float64 中进行
+    """
+    n = len(close)
+    rsi = np.full(n, np.nan)
+    gains = np.zeros(n)
+    losses = np.zeros(n)
+    gain_sum = 0.0
+    loss_sum = 0.0
+    for i in range(n):
+        if i > 0:
+            delta = np.float64(close[i]) - close[i - 1]
+            if delta > 0:
+                gains[i] = delta
+            elif delta < 0:
+                losses[i] = -delta
+        gain_sum += gains[i]
+        loss_sum += losses[i]
+        if i >= period:
+            gain_sum -= gains[i - period]
+            loss_sum -= losses[i - period]
+        if i >= period - 1:
+            if loss_sum > 0:
+                rsi[i] = 100.0 - 100.0 / (1.0 + gain_sum / loss_sum)
+            elif gain_sum > 0:
+                # 窗口内只有上涨：rs 为无穷大
+                rsi[i] = 100.0
+    return rsi
+
+
+@njit(cache=True)
+def _trend_template_features(high, low, close, sma_short, sma_med, sma_long, extreme_window):
+    """
+    一次遍历同时得到趋势模板所需的三条均线与 52 周高低点
+    均线用滑动求和；高低点用单调队列，每根K线均摊 O(1)
+    语义与 rolling(window) 一致：窗口内含 NaN 或长度不足时为 NaN
+    返回: (sma_short, sma_med, sma_long, extreme_window 最低价, extreme_window 最高价)
+    """
+    n = len(close)
+    windows = (sma_short, sma_med, sma_long)
+    smas = np.full((3, n), np.nan)
+    sums = np.zeros(3)
+    low_ext = np.full(n, np.nan)
+    high_ext = np.full(n, np.nan)
+
+    # 单调队列存下标：min_q 中最低价递增，max_q 中最高价递减
+    min_q = np.empty(n, dtype=np.int64)
+    max_q = np.empty(n, dtype=np.int64)
+    min_head = min_tail = 0
+    max_head = max_tail = 0
+
+    # 最近一次出现 NaN 的位置；窗口起点在它之后才有效
+    close_nan = -1
+    low_nan = -1
+    high_nan = -1
+
+    for i in range(n):
+        c = close[i]
+        if np.isnan(c):
+            close_nan = i
+        else:
+            for k in range(3):
+                sums[k] += c
+        for k in range(3):
+            w = windows[k]
+            if i >= w and not np.isnan(close[i - w]):
+                sums[k] -= close[i - w]
+            if i >= w - 1 and close_nan <= i - w:
+                smas[k, i] = sums[k] / w
+
+        # 含 NaN 的窗口全部无效，之前的候选不会再被用到，直接清空队列
+        lo = low[i]
+        if np.isnan(lo):
+            low_nan = i
+            min_head = min_tail = 0
+        else:
+            while min_tail > min_head and low[min_q[min_tail - 1]] >= lo:
+                min_tail -= 1
+            min_q[min_tail] = i
+            min_tail += 1
+
+        hi = high[i]
+        if np.isnan(hi):
+            high_nan = i
+            max_head = max_tail = 0
+        else:
+            while max_tail > max_head and high[max_q[max_tail - 1]] <= hi:
+                max_tail -= 1
+            max_q[max_tail] = i
+            max_tail += 1
+
+        start = i - extreme_window + 1
+        while min_tail > min_head and min_q[min_head] < start:
+            min_head += 1
+        while max_tail > max_head and max_q[max_head] < start:
+            max_head += 1
+        if start >= 0 and low_nan < start:
+            low_ext[i] = low[min_q[min_head]]
+        if start >= 0 and high_nan < start:
+            high_ext[i] = high[max_q[max_head]]
+
+    return smas[0], smas[1], smas[2], low_ext, high_ext
+
+
+@njit('UniTuple(float64[:, :], 5)(float32[:, :], float32[:, :], float32[:, :], int64, int64, int64, int64)',
+      cache=True, nogil=True)
+def _trend_template_panel(high, low, close, sma_short, sma_med, sma_long, extreme_window):
+    """
+    _trend_template_features 的面板版本：输入为 (股票数 x 交易日) 的 C 连续矩阵，逐行计算
+    """
+    m, n = close.shape
+    out = np.empty((5, m, n))
+    for t in range(m):
+        features = _trend_template_features(high[t], low[t], close[t],
+                                            sma_short, sma_med, sma_long, extreme_window)
+        for k in range(5):
+            out[k, t] = features[k]
+    return out[0], out[1], out[2], out[3], out[4]
+
+
+@njit('boolean(float64[:], float64[:], float64, int64, float64)', cache=True, nogil=True)
+def _vcp_contraction(close, recent_volume, vol_sma50, period, tight_threshold):
+    """
+    VCP 波动收缩判定 (通知扫描器使用)
+    close: 最近 3*period 根收盘价 (由远到近)，按 period 分为远/中/近三段
+    recent_volume: 最近 5 根成交量; vol_sma50: 50 日均量 (由调用方计算，供量比复用)
+    三段归一化波动率 (样本标准差 / 均值) 依次下降、最近一段低于 tight_threshold，
+    且最近 5 日均量低于 50 日均量时返回 True
+    """
+    # 单次遍历: Welford 在线更新每段的均值与离差平方和 (数值稳定)，到段尾时得出该段波动率
+    vols = np.empty(3)
+    mean = 0.0
+    m2 = 0.0
+    for i in range(3 * period):
+        j = i % period
+        if j == 0:
+            mean = 0.0
+            m2 = 0.0
+        delta = close[i] - mean
+        mean += delta / (j + 1)
+        m2 += delta * (close[i] - mean)
+        if j == period - 1:
+            vols[i // period] = np.sqrt(m2 / (period - 1)) / mean
+
+    # VCP特征: 波动率逐渐降低 (Vol_Old > Vol_Mid > Vol_New)
+    is_contracting = vols[0] > vols[1] and vols[1] > vols[2]
+    is_tight = vols[2] < tight_threshold
+
+    # 成交量枯竭: 最近5天平均成交量 < 50日均量
+    volume_dry = recent_volume.mean() < vol_sma50
+
+    return is_contracting and is_tight and volume_dry
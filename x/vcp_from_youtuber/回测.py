@@ -87,14 +87,24 @@ class MeanReversionBacktester:
         """
         print("正在生成交易信号...")
 
-        # 使用Pandas的rank方法进行横向排名（axis=1）
-        # method='min' 处理平局，ascending=True 表示从小到大排序（跌幅最大的排在前面）
-        # 排名为 1 的股票即为跌幅最大的股票
-        daily_ranks = self.returns.rank(axis=1, method='min', ascending=True)
-
-        # 生成信号矩阵：若排名 <= top_n，则标记为True（买入信号）
+        # 只需每日跌幅最大的前N只，不必对整行完全排序：
+        # argpartition 按行做 O(N) 的部分选择，前 top_n 个位置即收益率最小的 top_n 只
+        returns = self.returns.to_numpy()
+        finite = np.isfinite(returns)
+        # NaN（首日或停牌）替换为 +inf，排在最后，不会被选入
+        safe_returns = np.where(finite, returns, np.inf)
+
+        # 生成信号矩阵：跌幅最大的前N只标记为True（买入信号）
         # 注意：这个信号是基于当日收盘价计算的
-        self.signals = (daily_ranks <= self.top_n)
+        if self.top_n >= returns.shape[1]:
+            signals = finite
+        else:
+            losers = np.argpartition(safe_returns, self.top_n - 1, axis=1)[:, :self.top_n]
+            signals = np.zeros(returns.shape, dtype=bool)
+            np.put_along_axis(signals, losers, True, axis=1)
+            # 当日有效数据不足 top_n 只时，被选中的 NaN 位置需剔除
+            signals &= finite
+        self.signals = pd.DataFrame(signals, index=self.returns.index, columns=self.returns.columns)
 
     def backtest(self):
         """
@@ -109,25 +119,43 @@ class MeanReversionBacktester:
         # 将信号下移一天，代表T日的信号在T+1日生效（产生T+1日的收益）
         # 假设：T日收盘买入（或T+1开盘买入），持有至T+1收盘。
         # 这里使用的是T+1日的 Close-to-Close 收益率。
-        positions = self.signals.shift(1).fillna(False)
+        positions = self.signals.shift(1, fill_value=False).to_numpy(dtype=bool)
+        returns = self.returns.to_numpy()
 
         # 每日持仓数量可能少于 top_n（例如某些股票停牌或数据缺失）
         # 计算每日实际持仓数，用于等权重分配资金
         daily_counts = positions.sum(axis=1)
 
-        # 避免除以零
-        weights = positions.div(daily_counts, axis=0).fillna(0)
-
-        # 策略每日收益率 = sum(个股收益率 * 权重)
-        self.strategy_daily_returns = (weights * self.returns).sum(axis=1)
+        # 策略每日收益率 = 持仓个股收益率之和 / 持仓数（等权重）
+        # 只对持仓位置取收益率，不再构造几乎全为 0 的权重矩阵；收益率为 NaN 的持仓按 0 计
+        position_returns = np.nansum(np.where(positions, returns, 0.0), axis=1)
+        strategy_daily = np.where(daily_counts > 0, position_returns / np.maximum(daily_counts, 1), 0.0)
+        self.strategy_daily_returns = pd.Series(strategy_daily, index=self.returns.index)
 
         # 计算基准收益率（这里简单使用股票池的等权重平均作为基准）
         # 在实际应用中，可以下载SPY数据作为基准
         self.benchmark_daily_returns = self.returns.mean(axis=1)
 
-        # 计算累积净值
-        self.strategy_cumulative = (1 + self.strategy_daily_returns).cumprod()
-        self.benchmark_cumulative = (1 + self.benchmark_daily_returns).cumprod()
+        # 计算累积净值（在 numpy 数组上累乘，只在最后包装回 Series 供绘图使用）
+        self.strategy_cumulative = self._cumulative(self.strategy_daily_returns)
+        self.benchmark_cumulative = self._cumulative(self.benchmark_daily_returns)
+
+    @staticmethod
+    def _cumulative(daily_returns):
+        """
+        由日收益率计算累积净值，与 (1 + r).cumprod() 一致：
+        NaN 日不参与累乘，且该日净值保持为 NaN
+        """
+        returns = daily_returns.to_numpy(dtype=np.float64)
+        cumulative = np.nancumprod(1 + returns)
+        cumulative[np.isnan(returns)] = np.nan
+        return pd.Series(cumulative, index=daily_returns.index)
+
+    @staticmethod
+    def _drawdown(cumulative):
+        """回撤序列：(净值 - 历史最高净值) / 历史最高净值，fmax 累积时跳过 NaN"""
+        rolling_max = np.fmax.accumulate(cumulative)
+        return (cumulative - rolling_max) / rolling_max
 
     def calculate_metrics(self):
         """
@@ -146,9 +174,7 @@ class MeanReversionBacktester:
         sharpe = (cagr - rf) / volatility if volatility != 0 else 0
 
         # 最大回撤
-        rolling_max = self.strategy_cumulative.cummax()
-        drawdown = (self.strategy_cumulative - rolling_max) / rolling_max
-        max_drawdown = drawdown.min()
+        max_drawdown = np.nanmin(self._drawdown(self.strategy_cumulative.to_numpy()))
 
         self.metrics = {
             '总收益率': f"{total_return:.2%}",
@@ -176,8 +202,8 @@ class MeanReversionBacktester:
         ax1.grid(True, alpha=0.3)
 
         # 下图：回撤区域
-        rolling_max = self.strategy_cumulative.cummax()
-        drawdown = (self.strategy_cumulative - rolling_max) / rolling_max
+        drawdown = pd.Series(self._drawdown(self.strategy_cumulative.to_numpy()),
+                             index=self.strategy_cumulative.index)
 
         ax2.fill_between(drawdown.index, drawdown, 0, color='#d62728', alpha=0.3, label='回撤幅度')
         ax2.plot(drawdown.index, drawdown, color='#d62728', linewidth=1)
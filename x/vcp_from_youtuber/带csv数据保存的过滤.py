@@ -21,9 +21,20 @@ import pandas as pd
 import numpy as np
 import time
 import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import warnings
 
+try:
+    from tqdm import tqdm
+except ImportError:
+    # 未安装 tqdm 时不显示进度条
+    def tqdm(iterable, **kwargs):
+        return iterable
+
+from vcp_kernels import _supertrend_bands_loop, _trend_template_panel
+
 # Suppress pandas FutureWarnings (e.g., specific plotting deprecations)
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
@@ -33,7 +44,7 @@ class Config:
     SMA_SHORT = 50
     SMA_MED = 150
     SMA_LONG = 200
-    RS_LOOKBACKS =  # 3, 6, 9, 12 months (approx trading days)
+    RS_LOOKBACKS = [63, 126, 189, 252]  # 3, 6, 9, 12 months (approx trading days)
     RS_WEIGHTS = [0.4, 0.2, 0.2, 0.2]  # IBD style weighting
     SUPERTREND_PERIOD = 10
     SUPERTREND_MULTIPLIER = 3
@@ -46,6 +57,9 @@ class Config:
     # 数据配置
     START_DATE = (datetime.now() - timedelta(days=365 * 2)).strftime('%Y-%m-%d')
     CACHE_DIR = "stock_data_cache"
+    # 价格约6位有效数字、阈值均为百分比，float32 精度足够且内存带宽减半
+    PRICE_DTYPE = 'float32'
+    TICKER_LIST_TTL_DAYS = 7  # 成分股列表变化很慢，每周刷新一次即可
 
 
 class DataFetcher:
@@ -56,28 +70,58 @@ class DataFetcher:
             os.makedirs(Config.CACHE_DIR)
 
     def get_sp500_tickers(self):
-        """Fetches current S&P 500 tickers from Wikipedia."""
+        """Fetches current S&P 500 tickers from Wikipedia (cached on disk for a week)."""
+        cache_path = os.path.join(Config.CACHE_DIR, "sp500.pkl")
+        if os.path.exists(cache_path):
+            age = datetime.now() - datetime.fromtimestamp(os.path.getmtime(cache_path))
+            if age < timedelta(days=Config.TICKER_LIST_TTL_DAYS):
+                with open(cache_path, 'rb') as f:
+                    return pickle.load(f)
+
         try:
             url = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
             payload = pd.read_html(url)
-            tickers = payload.values.tolist()
+            tickers = payload[0]['Symbol'].tolist()
             # Clean tickers (e.g., BRK.B -> BRK-B for yfinance)
             tickers = [t.replace('.', '-') for t in tickers]
+            with open(cache_path, 'wb') as f:
+                pickle.dump(tickers, f)
             return tickers
         except Exception as e:
             print(f"Error fetching S&P 500 list: {e}")
+            # A stale list beats no list
+            if os.path.exists(cache_path):
+                with open(cache_path, 'rb') as f:
+                    return pickle.load(f)
             # Fallback list for testing
             return
 
-    def download_data(self, ticker):
-        """Downloads data for a single ticker with error handling."""
-        cache_path = os.path.join(Config.CACHE_DIR, f"{ticker}.csv")
+    def _cache_path(self, ticker):
+        # Parquet keeps dtypes and the DatetimeIndex, so reloads skip CSV date/float parsing
+        return os.path.join(Config.CACHE_DIR, f"{ticker}.parquet")
+
+    def _read_cache(self, ticker):
+        """Returns the cached frame if it was written today, otherwise None."""
+        cache_path = self._cache_path(ticker)
 
         # Simple cache logic: if file exists and is modified today, use it.
         if os.path.exists(cache_path):
             file_time = datetime.fromtimestamp(os.path.getmtime(cache_path))
             if file_time.date() == datetime.now().date():
-                return pd.read_csv(cache_path, index_col=0, parse_dates=True)
+                return self._downcast(pd.read_parquet(cache_path))
+        return None
+
+    @staticmethod
+    def _downcast(df):
+        """Stores OHLCV (and Adj Close if present) as Config.PRICE_DTYPE."""
+        cols = [col for col in ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume'] if col in df.columns]
+        return df.astype({col: Config.PRICE_DTYPE for col in cols})
+
+    def download_data(self, ticker):
+        """Downloads data for a single ticker with error handling."""
+        df = self._read_cache(ticker)
+        if df is not None:
+            return df
 
         try:
             # Thread safety handling could be added here, but sequential is safer for rate limits
@@ -88,234 +132,204 @@ class DataFetcher:
 
             # Ensure index is Datetime
             df.index = pd.to_datetime(df.index)
+            df = self._downcast(df)
 
             # Save to cache
-            df.to_csv(cache_path)
+            df.to_parquet(self._cache_path(ticker), compression='zstd')
             return df
         except Exception as e:
             print(f"Failed to download {ticker}: {e}")
             return None
 
+    def download_many(self, tickers, chunk=100):
+        """
+        Downloads many tickers with batched yf.download calls (threaded inside yfinance).
+        Only tickers without a fresh cache are requested. Returns {ticker: df}.
+        """
+        frames = {}
+        stale = []
+        for ticker in tickers:
+            df = self._read_cache(ticker)
+            if df is None:
+                stale.append(ticker)
+            else:
+                frames[ticker] = df
+
+        for start in range(0, len(stale), chunk):
+            batch = stale[start:start + chunk]
+            print(f"Downloading {start + len(batch)}/{len(stale)}...")
+            try:
+                data = yf.download(batch, start=Config.START_DATE, group_by='ticker',
+                                   threads=True, progress=False, auto_adjust=True)
+            except Exception as e:
+                print(f"Failed to download batch starting at {batch[0]}: {e}")
+                continue
+
+            if data.empty:
+                continue
+
+            for ticker in batch:
+                # group_by='ticker' yields (ticker, field) MultiIndex columns
+                if isinstance(data.columns, pd.MultiIndex):
+                    if ticker not in data.columns.get_level_values(0):
+                        continue
+                    df = data.xs(ticker, level=0, axis=1)
+                else:
+                    df = data
+                # The batch is aligned on the union of dates; drop rows this ticker lacks
+                df = df.dropna(how='all')
+                if df.empty:
+                    continue
+
+                df.index = pd.to_datetime(df.index)
+                df = self._downcast(df)
+                df.to_parquet(self._cache_path(ticker), compression='zstd')
+                frames[ticker] = df
+
+        return frames
+
 
 class IndicatorEngine:
     """Calculates technical indicators vectorially."""
 
     @staticmethod
-    def add_moving_averages(df):
-        df = df['Close'].rolling(window=Config.SMA_SHORT).mean()
-        df = df['Close'].rolling(window=Config.SMA_MED).mean()
-        df = df['Close'].rolling(window=Config.SMA_LONG).mean()
-        return df
-
-    @staticmethod
-    def add_52_week_stats(df):
-        # Rolling 252 days for 52 weeks
-        df = df['Low'].rolling(window=252).min()
-        df = df['High'].rolling(window=252).max()
-        return df
+    def trend_template_panels(closes, highs, lows):
+        """
+        SMA 50/150/200 and the 252-day low/high for every ticker at once: inputs are wide
+        (date x ticker) panels. All five stats come out of one fused pass per ticker
+        (vcp_kernels._trend_template_panel) instead of five separate rolling scans.
+        """
+        def as_rows(panel):
+            # (ticker x date), each ticker's history contiguous for the kernel. np.require also
+            # copies read-only buffers (Copy-on-Write views, e.g. the transpose of a one-ticker
+            # panel), which the eager float32[:, :] signature would reject
+            return np.require(panel.to_numpy(dtype=np.float32).T, requirements=['C', 'W'])
+
+        stats = _trend_template_panel(as_rows(highs), as_rows(lows), as_rows(closes),
+                                      Config.SMA_SHORT, Config.SMA_MED, Config.SMA_LONG, 252)
+        names = ['SMA_50', 'SMA_150', 'SMA_200', 'Low_52W', 'High_52W']
+        return {name: pd.DataFrame(values.T, index=closes.index, columns=closes.columns)
+                for name, values in zip(names, stats)}
 
     @staticmethod
-    def calculate_rs_score(df):
+    def calculate_rs_scores(closes):
         """
-        Calculates raw RS score based on weighted ROC.
-        Returns the scalar score of the latest date.
+        Calculates raw RS scores (weighted ROC) for every ticker at once.
+        closes: (N_days x N_tickers) close panel on a shared trading calendar.
+        Returns a Series indexed by ticker; tickers without enough history are NaN.
         """
-        if len(df) < 260:
-            return -np.inf
-
-        try:
-            current_close = df['Close'].iloc[-1]
+        if len(closes) <= max(Config.RS_LOOKBACKS):
+            return pd.Series(np.nan, index=closes.columns)
 
-            # Calculate ROCs
-            roc_3m = (current_close / df['Close'].iloc]) - 1
-            roc_6m = (current_close / df['Close'].iloc]) - 1
-            roc_9m = (current_close / df['Close'].iloc]) - 1
-            roc_12m = (current_close / df['Close'].iloc]) - 1
+        values = closes.to_numpy(dtype=np.float64)
+        last = values[-1]
 
-            # Weighted Score
-            weights = Config.RS_WEIGHTS
-            score = (weights * roc_3m) + (weights[1] * roc_6m) + \
-                    (weights[2] * roc_9m) + (weights[3] * roc_12m)
+        # ROCs as a (4 x N_tickers) matrix, weighted in one product
+        rocs = np.vstack([last / values[-1 - k] - 1 for k in Config.RS_LOOKBACKS])
+        score = np.asarray(Config.RS_WEIGHTS) @ rocs
 
-            return score * 100
-        except IndexError:
-            return -np.inf
+        return pd.Series(score * 100, index=closes.columns)
 
     @staticmethod
     def add_supertrend(df, period=10, multiplier=3):
         """
         Manual implementation of Supertrend to avoid external lib dependencies.
         """
-        # Calculate TR
-        high = df['High']
-        low = df['Low']
-        close = df['Close']
-
-        tr1 = high - low
-        tr2 = (high - close.shift()).abs()
-        tr3 = (low - close.shift()).abs()
-
-        # Max of the three
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        atr = tr.rolling(period).mean()
-
-        # HL2
-        hl2 = (high + low) / 2
-
-        # Basic bands
-        final_upper = pd.Series(0.0, index=df.index)
-        final_lower = pd.Series(0.0, index=df.index)
-        supertrend = pd.Series(0.0, index=df.index)
-        in_uptrend = pd.Series(True, index=df.index)
-
-        # Vectorization of supertrend is hard due to recursive logic, using Numba or loop
-        # Using loop for clarity and compatibility (speed is acceptable for daily data)
-
-        basic_upper = hl2 + (multiplier * atr)
-        basic_lower = hl2 - (multiplier * atr)
-
-        # Pre-fill lists for speed
-        bu = basic_upper.values
-        bl = basic_lower.values
-        close_vals = close.values
-        fu = np.zeros(len(df))
-        fl = np.zeros(len(df))
-        st = np.zeros(len(df))
-        trend = np.zeros(len(df), dtype=bool)  # True for Up
-
-        for i in range(period, len(df)):
-            # Final Upper
-            if bu[i] < fu[i - 1] or close_vals[i - 1] > fu[i - 1]:
-                fu[i] = bu[i]
-            else:
-                fu[i] = fu[i - 1]
-
-            # Final Lower
-            if bl[i] > fl[i - 1] or close_vals[i - 1] < fl[i - 1]:
-                fl[i] = bl[i]
-            else:
-                fl[i] = fl[i - 1]
-
-            # Trend
-            if trend[i - 1]:  # Was Up
-                if close_vals[i] < fl[i]:
-                    trend[i] = False
-                else:
-                    trend[i] = True
-            else:  # Was Down
-                if close_vals[i] > fu[i]:
-                    trend[i] = True
-                else:
-                    trend[i] = False
-
-            if trend[i]:
-                st[i] = fl[i]
-            else:
-                st[i] = fu[i]
-
-        df = st
-        df = trend
+        # Float32 columns come back as read-only Copy-on-Write views; the kernel's eager
+        # float32[:] signature only matches writable C arrays, so copy when needed
+        high = np.require(df['High'].to_numpy(), np.float32, ['C', 'W'])
+        low = np.require(df['Low'].to_numpy(), np.float32, ['C', 'W'])
+        close = np.require(df['Close'].to_numpy(), np.float32, ['C', 'W'])
+
+        # TR, Wilder ATR and the recursive final bands are all computed bar by bar in one
+        # pass inside vcp_kernels._supertrend_bands_loop (compiled by numba when available)
+        supertrend, in_uptrend = _supertrend_bands_loop(high, low, close, period, float(multiplier))
+
+        df['Supertrend'] = supertrend
+        df['In_Uptrend'] = in_uptrend  # True for Up
         return df
 
 
 class StrategyScreener:
-    def __init__(self):
+    def __init__(self, verbose=True):
         self.fetcher = DataFetcher()
         self.engine = IndicatorEngine()
+        # Progress bar on interactive runs; pass verbose=False for scripted/profiled runs
+        self.verbose = verbose
 
-    def check_minervini_conditions(self, df):
+    def screen_minervini(self, closes, panels):
         """
-        Validates the 8 rules of the Trend Template.
-        Returns (is_match, reason_if_fail)
+        Vectorized Trend Template over the ticker axis.
+        Returns a boolean Series indexed by ticker; NaN stats (short history) fail.
         """
-        try:
-            curr = df.iloc[-1]
-            sma_50 = curr
-            sma_150 = curr
-            sma_200 = curr
-            close = curr['Close']
-            low_52 = curr
-            high_52 = curr
-
-            # Trend of 200 SMA (Slope positive)
-            # Compare current SMA_200 with 20 days ago
-            sma_200_prev = df.iloc[-21]
-
-            # Rule 1: Price > 150 and 200
-            if not (close > sma_150 and close > sma_200):
-                return False, "Price below LT MAs"
-
-            # Rule 2: 150 > 200
-            if not (sma_150 > sma_200):
-                return False, "150 SMA < 200 SMA"
-
-            # Rule 3: 200 Trending Up
-            if not (sma_200 > sma_200_prev):
-                return False, "200 SMA not trending up"
-
-            # Rule 4: 50 > 150 and 50 > 200
-            if not (sma_50 > sma_150 and sma_50 > sma_200):
-                return False, "50 SMA not above LT MAs"
-
-            # Rule 5: Price > 50 SMA
-            if not (close > sma_50):
-                return False, "Price below 50 SMA"
-
-            # Rule 6: 30% above 52W Low
-            if not (close >= low_52 * Config.ABOVE_52W_LOW_PCT):
-                return False, "Less than 30% off lows"
-
-            # Rule 7: Within 25% of 52W High
-            if not (close >= high_52 * Config.WITHIN_52W_HIGH_PCT):
-                return False, "Too far from highs (>25%)"
-
-            return True, "Pass"
-
-        except Exception as e:
-            return False, f"Error: {e}"
+        close = closes.iloc[-1]
+        sma_50 = panels['SMA_50'].iloc[-1]
+        sma_150 = panels['SMA_150'].iloc[-1]
+        sma_200 = panels['SMA_200'].iloc[-1]
+        sma_200_prev = panels['SMA_200'].iloc[-21]
+        low_52 = panels['Low_52W'].iloc[-1]
+        high_52 = panels['High_52W'].iloc[-1]
+
+        return ((close > sma_150) & (close > sma_200)            # Rule 1
+                & (sma_150 > sma_200)                            # Rule 2
+                & (sma_200 > sma_200_prev)                       # Rule 3
+                & (sma_50 > sma_150) & (sma_50 > sma_200)        # Rule 4
+                & (close > sma_50)                               # Rule 5
+                & (close >= low_52 * Config.ABOVE_52W_LOW_PCT)   # Rule 6
+                & (close >= high_52 * Config.WITHIN_52W_HIGH_PCT))  # Rule 7
+
+    def analyze_survivor(self, ticker, df):
+        """Supertrend direction and volatility context for a ticker that passed the template."""
+        # Add Supertrend for Context
+        df = self.engine.add_supertrend(df)
+        st_direction = "BULLISH" if df['In_Uptrend'].iloc[-1] else "BEARISH"
+
+        # Volatility Contraction Proxy: Standard Deviation of last 20 closes / Price
+        # Only the last window is needed, so take it directly instead of a full rolling std
+        last_20 = df['Close'].to_numpy()[-20:]
+        volatility = np.std(last_20, ddof=1) / last_20[-1]
+
+        return {
+            'Ticker': ticker,
+            'Close': round(df['Close'].iloc[-1], 2),
+            'Supertrend': st_direction,
+            'Volatility_20d': round(volatility * 100, 2),
+            'Industry': 'N/A'  # Requires external data source
+        }
 
     def run(self):
         print("Fetching Ticker List...")
         tickers = self.fetcher.get_sp500_tickers()
         print(f"Analyzing {len(tickers)} stocks...")
 
-        results =
-
-        # Step 1: Calculate Metrics and Pre-filter
-        for i, ticker in enumerate(tickers):
-            if i % 50 == 0:
-                print(f"Processing {i}/{len(tickers)}...")
-
-            df = self.fetcher.download_data(ticker)
-            if df is None or len(df) < 260:
-                continue
-
-            # Calculate Indicators
-            df = self.engine.add_moving_averages(df)
-            df = self.engine.add_52_week_stats(df)
+        results = []
 
-            # Check Minervini Template
-            passed, reason = self.check_minervini_conditions(df)
+        # One batched download instead of a blocking request per ticker
+        data = self.fetcher.download_many(tickers)
 
-            if passed:
-                # Calculate RS Score only for those who pass trend template to save time
-                rs_score = self.engine.calculate_rs_score(df)
+        # Wide (date x ticker) panels on the union calendar
+        closes = pd.DataFrame({ticker: df['Close'] for ticker, df in data.items()})
+        history = closes.count()
+        closes = closes.ffill()
+        highs = pd.DataFrame({ticker: df['High'] for ticker, df in data.items()}).ffill()
+        lows = pd.DataFrame({ticker: df['Low'] for ticker, df in data.items()}).ffill()
 
-                # Add Supertrend for Context
-                df = self.engine.add_supertrend(df)
-                st_direction = "BULLISH" if df.iloc[-1] else "BEARISH"
+        # RS for the whole universe in one matrix op, ranked against every ticker (not just survivors)
+        rs_scores = self.engine.calculate_rs_scores(closes)
+        rs_ratings = rs_scores.rank(pct=True).mul(100)
 
-                # Volatility Contraction Proxy: Standard Deviation of last 20 closes / Price
-                volatility = df['Close'].rolling(20).std().iloc[-1] / df['Close'].iloc[-1]
+        # Step 1: Calculate Metrics and Pre-filter (all tickers at once)
+        panels = self.engine.trend_template_panels(closes, highs, lows)
+        passed = self.screen_minervini(closes, panels) & (history >= 260)
+        survivors = passed.index[passed]
 
-                results.append({
-                    'Ticker': ticker,
-                    'Close': round(df['Close'].iloc[-1], 2),
-                    'RS_Raw_Score': rs_score,
-                    'Supertrend': st_direction,
-                    'Volatility_20d': round(volatility * 100, 2),
-                    'Industry': 'N/A'  # Requires external data source
-                })
+        # Survivors are independent and the Supertrend kernel releases the GIL, so fan out on threads
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            rows = executor.map(lambda ticker: self.analyze_survivor(ticker, data[ticker]), survivors)
+            for row in tqdm(rows, total=len(survivors), desc='Screening', disable=not self.verbose):
+                row['RS_Raw_Score'] = rs_scores[row['Ticker']]
+                row['RS_Rating'] = rs_ratings[row['Ticker']]
+                results.append(row)
 
         # Step 2: Calculate Percentile Ranks for RS
         if not results:
@@ -324,13 +338,11 @@ class StrategyScreener:
 
         df_res = pd.DataFrame(results)
 
-        # Rank the raw scores to get 0-99 ratings
-        # Note: In a real scenario, this rank is against the WHOLE market, not just survivors.
-        # But this is the best estimation with available data.
-        df_res = pd.qcut(df_res, 100, labels=False, duplicates='drop')
+        # Survivors have >= 260 bars, so every one has a rating; 0-100 fits int8
+        df_res['RS_Rating'] = df_res['RS_Rating'].astype(np.int8)
 
         # Final Filter: RS Rating > Threshold
-        final_df = df_res >= Config.MIN_RS_RATING].sort_values(by='RS_Rating', ascending=False)
+        final_df = df_res[df_res['RS_Rating'] >= Config.MIN_RS_RATING].sort_values(by='RS_Rating', ascending=False)
 
         print(f"\nFound {len(final_df)} candidates matching all criteria.")
         print("-" * 80)
@@ -13,91 +13,72 @@ def get_rs_rating(tickers_list, benchmark_ticker="^GSPC"):
     """
     计算股票列表的相对强度评级 (RS Rating) 代理值。
     逻辑：计算过去一年的加权收益率，然后在股票池内进行百分位排序。
+    返回: (RS 评级表, 收盘价面板)，收盘价面板供后续趋势模板检查复用，避免二次下载
     """
-    rs_data =  None  #todo 自己维护标普500数据池
     end_date = datetime.datetime.now()
     # 获取一年前的日期，多取几天以确保有数据
     start_date = end_date - datetime.timedelta(days=400)
 
     print(f"正在计算 {len(tickers_list)} 只股票的相对强度...")
 
-    for ticker in tickers_list:
-        try:
-            # 下载数据，progress=False 关闭进度条以减少杂乱输出
-            df = yf.download(ticker, start=start_date, end=end_date, progress=False)
-
-            # 确保数据长度足够（至少252个交易日）
-            if len(df) < 252:
-                continue
-
-            # 获取关键时间点的收盘价（使用Adj Close以包含股息影响）
-            # 注意：yfinance 新版下载的数据列名可能是多层索引，需注意处理
-            if 'Adj Close' in df.columns:
-                series = df['Adj Close']
-            else:
-                series = df['Close']
-
-            current_price = series.iloc[-1]
-            price_3m_ago = series.iloc[-63]  # 约3个月前
-            price_6m_ago = series.iloc[-126]  # 约6个月前
-            price_9m_ago = series.iloc[-189]  # 约9个月前
-            price_12m_ago = series.iloc[-252]  # 约1年前
-
-            # 计算各周期收益率
-            ret_3m = (current_price - price_3m_ago) / price_3m_ago
-            ret_6m = (current_price - price_6m_ago) / price_6m_ago
-            ret_9m = (current_price - price_9m_ago) / price_9m_ago
-            ret_12m = (current_price - price_12m_ago) / price_12m_ago
-
-            # 计算加权分数 (IBD 给予近况更高权重)
-            # 权重分配：近3个月(40%), 近6个月(20%), 近9个月(20%), 近12个月(20%)
-            weighted_score = (0.4 * ret_3m) + (0.2 * ret_6m) + (0.2 * ret_9m) + (0.2 * ret_12m)
-
-            rs_data.append({
-                'Ticker': ticker,
-                'RS_Score': weighted_score
-            })
+    try:
+        # 一次批量下载全部股票 (yfinance 内部多线程)，不再逐只发起请求
+        # auto_adjust=True 时 Close 已复权（包含股息影响），不再需要 Adj Close
+        data = yf.download(tickers_list, start=start_date, end=end_date, threads=True,
+                           progress=False, group_by='column', auto_adjust=True)
+    except Exception as e:
+        print(f"批量下载失败: {e}")
+        return pd.DataFrame(), pd.DataFrame()
 
-        except Exception as e:
-            # 实际生产中应记录日志
-            continue
+    if data.empty:
+        return pd.DataFrame(), pd.DataFrame()
 
-    # 创建 DataFrame
-    df_rs = pd.DataFrame(rs_data)
+    # (交易日 x 股票) 的收盘价面板；只有一只股票时 yfinance 可能返回 Series
+    close = data['Close']
+    if isinstance(close, pd.Series):
+        close = close.to_frame(tickers_list[0])
 
-    if df_rs.empty:
-        return pd.DataFrame()
+    # 确保数据长度足够（至少252个交易日）
+    close = close.loc[:, close.count() >= 252].ffill()
+    if close.empty:
+        return pd.DataFrame(), pd.DataFrame()
+
+    # 获取关键时间点的收盘价，整列向量化计算各周期收益率
+    current_price = close.iloc[-1]
+    ret_3m = current_price / close.iloc[-63] - 1  # 约3个月前
+    ret_6m = current_price / close.iloc[-126] - 1  # 约6个月前
+    ret_9m = current_price / close.iloc[-189] - 1  # 约9个月前
+    ret_12m = current_price / close.iloc[-252] - 1  # 约1年前
+
+    # 计算加权分数 (IBD 给予近况更高权重)
+    # 权重分配：近3个月(40%), 近6个月(20%), 近9个月(20%), 近12个月(20%)
+    weighted_score = (0.4 * ret_3m) + (0.2 * ret_6m) + (0.2 * ret_9m) + (0.2 * ret_12m)
+
+    # 创建 DataFrame
+    df_rs = pd.DataFrame({'Ticker': close.columns, 'RS_Score': weighted_score.to_numpy()})
 
     # 计算百分位排名 (0 到 100)
-    df_rs = df_rs.rank(pct=True) * 100
-    df_rs = df_rs.round(2)
+    df_rs['RS_Rating'] = (df_rs['RS_Score'].rank(pct=True) * 100).round(2)
 
     # 按照排名降序排列
-    return df_rs.sort_values(by='RS_Rating', ascending=False)
+    return df_rs.sort_values(by='RS_Rating', ascending=False), close
 
 
-def check_minervini_criteria(ticker, rs_rating):
+def check_minervini_criteria(ticker, rs_rating, close):
     """
     检查单只股票是否符合 Mark Minervini 的趋势模板八大准则。
     参数:
         ticker: 股票代码
         rs_rating: 预先计算好的 RS 评级
+        close: 该股票的复权收盘价序列（来自 get_rs_rating 已下载的约 400 天数据，
+               足够覆盖 200 日均线及其 1 个月趋势和 52 周高低点）
     返回:
         字典: 包含检查结果和关键数据；若不符合返回 None 或包含失败原因。
     """
     try:
-        # 下载过去 2 年的数据，以便计算 200 日均线及其趋势
-        df = yf.download(ticker, period="2y", progress=False)
+        close = close.dropna()
 
-        if len(df) < 250:  # 数据不足
-            return None
-
-        # 处理列名（兼容性）
-        if 'Close' in df.columns:
-            close = df['Close']
-        elif 'Adj Close' in df.columns:
-            close = df['Adj Close']
-        else:
+        if len(close) < 250:  # 数据不足
             return None
 
         # --- 计算移动平均线 ---
@@ -176,29 +157,26 @@ def run_screener(tickers_list):
     主执行函数
     """
     # 1. 首先计算 RS Rating，因为这需要全市场数据且可以作为第一道过滤器
-    df_rs = get_rs_rating(tickers_list)
+    df_rs, close_panel = get_rs_rating(tickers_list)
 
     if df_rs.empty:
         print("无数据或计算失败。")
         return pd.DataFrame()
 
-    # 只保留 RS Rating >= 70 的股票进入下一轮，减少网络请求
+    # 只保留 RS Rating >= 70 的股票进入下一轮
     # 注意：如果市场极度低迷，可能没有任何股票 RS > 70，此时应灵活调整阈值
-    potential_candidates = [df_rs >= 70].tolist()  #todo 取大于70
+    potential_candidates = df_rs[df_rs['RS_Rating'] >= 70]
 
     print(f"通过 RS 筛选的股票数量: {len(potential_candidates)}")
 
-    final_results =[]
-
-    # 2. 逐个检查技术形态
-    for ticker in potential_candidates:
-    # 获取该股票的 RS 值
-        rs_val = df_rs.loc == [ticker, 'RS_Rating'].values
+    final_results = []
 
-    result = check_minervini_criteria(ticker, rs_val)
-    if result:
-        final_results.append(result)
-    print(f"发现符合条件股票: {ticker}")
+    # 2. 逐个检查技术形态，直接复用 RS 阶段下载的收盘价，不再重复请求
+    for ticker, rs_val in zip(potential_candidates['Ticker'], potential_candidates['RS_Rating']):
+        result = check_minervini_criteria(ticker, rs_val, close_panel[ticker])
+        if result:
+            final_results.append(result)
+            print(f"发现符合条件股票: {ticker}")
 
     # 3. 输出结果
     return pd.DataFrame(final_results)
@@ -19,10 +19,20 @@
 import yfinance as yf
 import pandas as pd
 import numpy as np
+import os
+from concurrent.futures import ThreadPoolExecutor
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime, timedelta
 
+try:
+    from scipy.stats import rankdata
+except ImportError:
+    # 未安装 scipy 时退化为 pandas 的 rank
+    rankdata = None
+
+from vcp_kernels import _rsi_sma_loop
+
 # ==========================================
 # 1. 配置参数与标的池定义
 # ==========================================
@@ -37,6 +47,11 @@ SMA_LONG = 200  # 长期均线窗口
 RSI_PERIOD = 14  # RSI计算周期
 VOL_WINDOW = 20  # 成交量均值窗口
 
+# 评分因子：原始指标列 -> 百分位得分列，及各自权重
+FACTOR_COLUMNS = ['Trend_Signal', 'RSI', 'Vol_Ratio']
+FACTOR_SCORE_COLUMNS = ['Trend_Score', 'Momentum_Score', 'Volume_Score']
+FACTOR_WEIGHTS = [0.4, 0.4, 0.2]
+
 
 # ==========================================
 # 2. 数据获取模块 (Data Ingestion)
@@ -68,7 +83,8 @@ def fetch_market_data(tickers, period):
             threads=True
         )
         print("[系统状态] 数据下载完成。")
-        return data
+        # 价格与成交量统一存为 float32：精度足够，内存带宽减半
+        return data.astype('float32')
     except Exception as e:
         print(f"[系统错误] 数据下载失败: {e}")
         return None
@@ -77,84 +93,80 @@ def fetch_market_data(tickers, period):
 # ==========================================
 # 3. 指标计算引擎 (Calculation Engine)
 # ==========================================
-def calculate_technical_indicators(data, tickers):
+def _ticker_indicators(data, ticker):
     """
-    遍历每只股票，计算技术指标。
-    虽然这里用了循环，但每个股票内部的计算是向量化的。
+    计算单只股票的技术指标，返回结果字典；数据不足或出错时返回 None。
     """
-    screener_results =
+    try:
+        # 提取单只股票的数据副本
+        # 注意：如果下载失败，某些Ticker可能不在列中，需做异常处理
+        if ticker not in data.columns.levels[0]:
+            return None
+
+        df = data[ticker].copy()
+
+        # 数据清洗：去除空值
+        df.dropna(inplace=True)
+
+        if len(df) < SMA_LONG:
+            # 如果上市时间不足200天，无法计算200日均线，跳过
+            return None
+
+        # --- A. 趋势指标 (Trend) ---
+        # 收盘价复制为可写的 float32 数组: float32 列的 to_numpy() 是只读视图 (Copy-on-Write)，
+        # numba 内核的 float32[:] 签名不接受
+        close_arr = np.require(df['Close'].to_numpy(), np.float32, ['C', 'W'])
+
+        # 计算50日和200日简单移动平均线：只需最新一天的数值，直接对末尾切片求均值
+        current_close = float(close_arr[-1])
+        sma_50_val = close_arr[-SMA_SHORT:].mean(dtype=np.float64)
+        sma_200_val = close_arr[-SMA_LONG:].mean(dtype=np.float64)
+
+        # 计算乖离率：价格相对于SMA200的偏离程度
+        # 正值表示在均线上方（牛市），负值表示在下方（熊市）
+        dist_sma_200_pct = (current_close - sma_200_val) / sma_200_val
+
+        # --- B. 动量指标 (Momentum - RSI) ---
+        # 使用简单移动平均计算RSI：涨跌分离与滑动求和在 numba 内核中一次遍历完成
+        current_rsi = _rsi_sma_loop(close_arr, RSI_PERIOD)[-1]
+
+        # --- C. 成交量指标 (Volume) ---
+        # 计算量比：今日成交量 / 过去20日平均成交量
+        # 只用到最后一个窗口的均值，直接对末尾切片求均值，不必算整列 rolling
+        volume_arr = df['Volume'].to_numpy()
+        current_vol = volume_arr[-1]
+        vol_avg = volume_arr[-VOL_WINDOW:].mean()
+
+        vol_ratio = 0
+        if vol_avg > 0:
+            vol_ratio = current_vol / vol_avg
+
+        return {
+            'Ticker': ticker,
+            'Close': round(current_close, 2),
+            'SMA_200': round(sma_200_val, 2),
+            'Trend_Signal': dist_sma_200_pct,  # 用于排名的原始数据
+            'RSI': round(current_rsi, 2),
+            'Vol_Ratio': round(vol_ratio, 2)
+        }
+
+    except KeyError:
+        print(f"警告: 无法找到 {ticker} 的数据")
+    except Exception as e:
+        print(f"错误: 处理 {ticker} 时发生异常 - {e}")
+    return None
+
 
+def calculate_technical_indicators(data, tickers):
+    """
+    计算每只股票的技术指标。
+    各股票之间互不依赖，用线程池并发处理；RSI 内核以 nogil 方式编译，不受 GIL 串行化。
+    """
     print("\n[系统状态] 开始计算技术指标...")
 
-    for ticker in tickers:
-        try:
-            # 提取单只股票的数据副本
-            # 注意：如果下载失败，某些Ticker可能不在列中，需做异常处理
-            if ticker not in data.columns.levels:
-                continue
-
-            df = data[ticker].copy()
-
-            # 数据清洗：去除空值
-            df.dropna(inplace=True)
-
-            if len(df) < SMA_LONG:
-                # 如果上市时间不足200天，无法计算200日均线，跳过
-                continue
-
-            # --- A. 趋势指标 (Trend) ---
-            # 计算50日和200日简单移动平均线
-            df = df['Close'].rolling(window=SMA_SHORT).mean()
-            df = df['Close'].rolling(window=SMA_LONG).mean()
-
-            # 获取最新一天的数值
-            current_close = df['Close'].iloc[-1]
-            sma_50_val = df.iloc[-1]
-            sma_200_val = df.iloc[-1]
-
-            # 计算乖离率：价格相对于SMA200的偏离程度
-            # 正值表示在均线上方（牛市），负值表示在下方（熊市）
-            dist_sma_200_pct = (current_close - sma_200_val) / sma_200_val
-
-            # --- B. 动量指标 (Momentum - RSI) ---
-            delta = df['Close'].diff()
-            # 分离涨跌
-            gain = (delta.where(delta > 0, 0))
-            loss = (-delta.where(delta < 0, 0))
-
-            # 使用简单移动平均计算RSI (也可改为指数移动平均 ewm)
-            avg_gain = gain.rolling(window=RSI_PERIOD).mean()
-            avg_loss = loss.rolling(window=RSI_PERIOD).mean()
-
-            rs = avg_gain / avg_loss
-            df = 100 - (100 / (1 + rs))
-
-            current_rsi = df.iloc[-1]
-
-            # --- C. 成交量指标 (Volume) ---
-            # 计算量比：今日成交量 / 过去20日平均成交量
-            df['Vol_Avg'] = df['Volume'].rolling(window=VOL_WINDOW).mean()
-            current_vol = df['Volume'].iloc[-1]
-            vol_avg = df['Vol_Avg'].iloc[-1]
-
-            vol_ratio = 0
-            if vol_avg > 0:
-                vol_ratio = current_vol / vol_avg
-
-            # 将结果存入列表
-            screener_results.append({
-                'Ticker': ticker,
-                'Close': round(current_close, 2),
-                'SMA_200': round(sma_200_val, 2),
-                'Trend_Signal': dist_sma_200_pct,  # 用于排名的原始数据
-                'RSI': round(current_rsi, 2),
-                'Vol_Ratio': round(vol_ratio, 2)
-            })
-
-        except KeyError:
-            print(f"警告: 无法找到 {ticker} 的数据")
-        except Exception as e:
-            print(f"错误: 处理 {ticker} 时发生异常 - {e}")
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        rows = executor.map(lambda ticker: _ticker_indicators(data, ticker), tickers)
+        screener_results = [row for row in rows if row is not None]
 
     # 转换为DataFrame以便后续处理
     return pd.DataFrame(screener_results)
@@ -163,6 +175,20 @@ def calculate_technical_indicators(data, tickers):
 # ==========================================
 # 4. 评分与排名模型 (Scoring Model)
 # ==========================================
+def _pct_rank(values):
+    """
+    百分位排名 (平均名次 / 有效样本数)，NaN 保持为 NaN，与 Series.rank(pct=True) 一致
+    """
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    pct = np.full(len(values), np.nan)
+    if rankdata is not None:
+        pct[valid] = rankdata(values[valid], method='average') / valid.sum()
+    else:
+        pct[valid] = pd.Series(values[valid]).rank(pct=True).to_numpy()
+    return pct
+
+
 def apply_ranking_system(df):
     """
     核心逻辑：对各项指标进行百分位排名并加权。
@@ -173,24 +199,16 @@ def apply_ranking_system(df):
     scored_df = df.copy()
 
     # --- 归一化处理 (Normalization) ---
-    # 使用.rank(pct=True) 将绝对数值转换为 0.0 到 1.0 的百分位
-
+    # 在 ndarray 上做百分位排名，将绝对数值转换为 0.0 到 1.0 的百分位
     # 1. 趋势得分：价格在200日均线上方越高越好
-    scored_df = scored_df.rank(pct=True)
-
     # 2. 动量得分：RSI 越高代表动能越强 (注意：超买风险需人工二次确认，这里仅做动量筛选)
-    scored_df = scored_df.rank(pct=True)
-
     # 3. 量能得分：放量越多越好
-    scored_df = scored_df.rank(pct=True)
+    ranks = np.column_stack([_pct_rank(scored_df[col].to_numpy()) for col in FACTOR_COLUMNS])
+    scored_df[FACTOR_SCORE_COLUMNS] = ranks
 
     # --- 综合评分 (Composite Score) ---
-    # 权重设定：趋势(40%) + 动量(40%) + 量能(20%)
-    scored_df = (
-                        (0.4 * scored_df) +
-                        (0.4 * scored_df) +
-                        (0.2 * scored_df)
-                ) * 100  # 转换为 0-100 分制
+    # 权重设定：趋势(40%) + 动量(40%) + 量能(20%)，一次矩阵乘法完成加权
+    scored_df['Total_Score'] = ranks @ np.asarray(FACTOR_WEIGHTS) * 100  # 转换为 0-100 分制
 
     # 按总分降序排列
     scored_df = scored_df.sort_values(by='Total_Score', ascending=False)
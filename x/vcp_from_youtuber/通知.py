@@ -1,15 +1,41 @@
 # pip install yfinance pandas numpy requests
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import time
+import random
+from datetime import datetime, timezone
 import logging
 
+try:
+    # 可选依赖：编译实现的 JSON 序列化，直接输出 UTF-8 bytes
+    import orjson
+    _dumps = orjson.dumps
+except ImportError:
+    import json
+
+    def _dumps(obj):
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
+
+def _utc_timestamp():
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# HTTP 连接池大小 (Telegram / Discord 两个主机，每个主机的最大保活连接数)
+HTTP_POOL_CONNECTIONS = 4
+HTTP_POOL_MAXSIZE = 16
+# 通知发送的最大尝试次数 (429/5xx 由 urllib3 退避重试，连接错误由 _post 带抖动重试)
+NOTIFY_MAX_ATTEMPTS = 5
+
 
 class NotificationManager:
     def __init__(self, telegram_config=None, discord_config=None, email_config=None):
@@ -23,6 +49,59 @@ class NotificationManager:
         self.dc_config = discord_config
         self.email_config = email_config
 
+        # 复用 keep-alive 连接，避免每条通知都重新进行 TCP + TLS 握手
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=HTTP_POOL_CONNECTIONS,
+            pool_maxsize=HTTP_POOL_MAXSIZE,
+            # 限流/服务端错误按 1s, 2s, 4s, 8s, 16s 指数退避，并遵守 Retry-After
+            max_retries=Retry(total=NOTIFY_MAX_ATTEMPTS, connect=0, read=0, backoff_factor=1.0,
+                              status_forcelist=[429, 500, 502, 503, 504],
+                              allowed_methods=frozenset({'POST'}),
+                              respect_retry_after_header=True,
+                              raise_on_status=False),
+        )
+        self.session.mount('https://', adapter)
+
+        # SMTP 长连接，首次发送邮件时登录，之后复用 (省去每封邮件的 TLS 握手与认证)
+        self._smtp = None
+
+    def _ensure_smtp(self):
+        if self._smtp is None:
+            server = smtplib.SMTP('smtp.gmail.com', 587)
+            server.starttls()
+            server.login(self.email_config['sender'], self.email_config['password'])
+            self._smtp = server
+        return self._smtp
+
+    def close(self):
+        """
+        关闭 SMTP 长连接与 HTTP 连接池，程序结束前调用。
+        """
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except smtplib.SMTPException:
+                pass
+            self._smtp = None
+        self.session.close()
+
+    def _post(self, url, payload):
+        """
+        POST JSON，连接错误时按 [0, 2^attempt) 秒随机抖动退避后重试，避免多条通知同时重连。
+        只重试 ConnectionError (含 ConnectTimeout)：读超时时请求可能已送达，重发会造成重复提醒。
+        """
+        body = _dumps(payload)  # 只序列化一次，重试时复用
+        for attempt in range(NOTIFY_MAX_ATTEMPTS):
+            try:
+                return self.session.post(url, data=body, headers=_JSON_HEADERS, timeout=10)
+            except requests.exceptions.ConnectionError as e:
+                if attempt == NOTIFY_MAX_ATTEMPTS - 1:
+                    raise
+                delay = random.uniform(0, 2 ** attempt)
+                logging.warning(f"请求失败 ({e})，{delay:.1f}s 后重试")
+                time.sleep(delay)
+
     def send_telegram(self, message):
         """
         发送Telegram消息，包含重试机制以应对网络波动。
@@ -39,15 +118,16 @@ class NotificationManager:
         }
 
         try:
-            response = requests.post(url, json=payload, timeout=10)
+            response = self._post(url, payload)
             response.raise_for_status()
             logging.info("Telegram消息发送成功")
         except requests.exceptions.RequestException as e:
             logging.error(f"Telegram发送失败: {e}")
 
-    def send_discord(self, symbol, price, pivot, volume_ratio, trend_status):
+    def send_discord(self, symbol, price, pivot, volume_ratio, trend_status, timestamp=None):
         """
         发送Discord Embed消息，提供可视化的信号详情。
+        :param timestamp: ISO 8601 UTC 时间字符串；批量发送时由调用方生成一次后共用，缺省为当前时间
         参考:
         """
         if not self.dc_config:
@@ -62,7 +142,7 @@ class NotificationManager:
             "color": color,
             "fields":,
         "footer": {"text": "QuantAlgo Bot - VCP Strategy"},
-        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())
+        "timestamp": timestamp or _utc_timestamp()
         }
 
         payload = {
@@ -72,7 +152,7 @@ class NotificationManager:
         }
 
         try:
-            response = requests.post(self.dc_config['webhook_url'], json=payload, timeout=10)
+            response = self._post(self.dc_config['webhook_url'], payload)
             if response.status_code in:
                 logging.info(f"Discord消息发送成功: {symbol}")
             else:
@@ -90,16 +170,17 @@ class NotificationManager:
 
         msg = MIMEMultipart()
         msg['From'] = self.email_config['sender']
-        msg = self.email_config['receiver']
-        msg = subject
+        msg['To'] = self.email_config['receiver']
+        msg['Subject'] = subject
         msg.attach(MIMEText(html_content, 'html'))
 
         try:
-            server = smtplib.SMTP('smtp.gmail.com', 587)
-            server.starttls()
-            server.login(self.email_config['sender'], self.email_config['password'])
-            server.send_message(msg)
-            server.quit()
+            try:
+                self._ensure_smtp().send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                # 长连接已被服务器关闭 (如空闲超时)，重新登录后重发一次
+                self._smtp = None
+                self._ensure_smtp().send_message(msg)
             logging.info("邮件报告发送成功")
         except Exception as e:
             logging.error(f"邮件发送失败: {e}")
@@ -108,132 +189,350 @@ class NotificationManager:
 import yfinance as yf
 import pandas as pd
 import numpy as np
+import os
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+
+from vcp_kernels import _vcp_contraction
+
+# 单次批量下载的股票数上限 (Yahoo 对单个请求的代码数量有限制)
+DOWNLOAD_CHUNK = 20
+# 行情缓存目录 (每只股票一个 parquet 文件)，保留的历史天数，以及增量下载向前回补的天数
+CACHE_DIR = "vcp_cache"
+HISTORY_DAYS = 730
+CACHE_PAD_DAYS = 7
+# 增量数据与缓存重叠日期的收盘价相对误差超过此值，视为发生了拆股/分红 (复权价整体变化)
+ADJUST_RTOL = 1e-4
+# 价格约6位有效数字，float32 足够；成交量为整数股数，uint32 (上限约43亿) 足够
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+OHLCV_DTYPES = {**dict.fromkeys(PRICE_COLUMNS, np.float32), 'Volume': np.uint32}
+# 连续多少次下载为空即视为失效代码 (退市/改名)，之后的扫描直接跳过；
+# 最后一次失败超过 DEAD_TICKER_TTL_DAYS 天的记录作废，代码恢复交易 (复牌/重新上市) 后会被重新下载
+DEAD_AFTER_MISSES = 2
+DEAD_TICKER_TTL_DAYS = 30
+MISSES_PATH = os.path.join(CACHE_DIR, "dead_tickers.json")
+
+
+def _cache_path(ticker):
+    return os.path.join(CACHE_DIR, f"{ticker}.parquet")
+
+
+def _load_misses():
+    """读取 {代码: {'misses': 连续下载为空的次数, 'last_miss': 最后一次失败日期}}，丢弃过期记录。"""
+    if not os.path.exists(MISSES_PATH):
+        return {}
+    with open(MISSES_PATH) as f:
+        misses = json.load(f)
+    cutoff = (pd.Timestamp.today().normalize() - pd.Timedelta(days=DEAD_TICKER_TTL_DAYS)).date().isoformat()
+    return {t: m for t, m in misses.items() if m['last_miss'] >= cutoff}
 
 
 class VCPScreener:
     def __init__(self, tickers):
-        self.tickers = tickers
+        # 去重并排序；跳过已确认失效的代码，避免其拖慢整批下载并占用连接
+        self._misses = _load_misses()
+        dead = {t for t, m in self._misses.items() if m['misses'] >= DEAD_AFTER_MISSES}
+        self.tickers = sorted(set(tickers) - dead)
+        # 每只股票自身交易日上的行情 (价格 float32 / 成交量 uint32)，逐股票检测直接读取
+        self._frames = {}
+
+    def prefetch(self):
+        """
+        载入全部股票的2年日线：优先读本地 parquet 缓存，只增量下载缓存之后的新K线；
+        无缓存的股票按 DOWNLOAD_CHUNK 分批下载完整2年。今天已更新过的缓存直接使用。
+        增量数据与缓存的重叠K线复权价不一致 (期间发生拆股/分红) 时，该股票重新下载完整2年。
+        """
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        today = pd.Timestamp.today().normalize()
+
+        frames = {}
+        fresh = set()  # 今天已更新过缓存的股票
+        for ticker in self.tickers:
+            path = _cache_path(ticker)
+            if os.path.exists(path):
+                cached = pd.read_parquet(path)
+                if not cached.empty:
+                    frames[ticker] = cached
+                    if pd.Timestamp(os.path.getmtime(path), unit='s').normalize() >= today:
+                        fresh.add(ticker)
+
+        # 按缓存中最后一根K线日期从新到旧排序 (同日期保持字母序)，无缓存的排最后：
+        # 活跃股票集中在前几批先下载、先扫描，停牌/可能失效的代码集中在最后几批，不拖慢活跃批次
+        self.tickers.sort(key=lambda t: frames[t].index[-1] if t in frames else pd.Timestamp.min,
+                          reverse=True)
+
+        by_start = {}  # 下载起始日 -> 股票列表 (None 表示无缓存，需下载完整2年)
+        for ticker in self.tickers:
+            if ticker in fresh:
+                continue
+            start = None
+            if ticker in frames:
+                # 向前多取几天，覆盖区间端点不含当日以及近期数据被修正的情况
+                start = (frames[ticker].index[-1] - pd.Timedelta(days=CACHE_PAD_DAYS)).date()
+            by_start.setdefault(start, []).append(ticker)
+
+        n_batches = 0
+        rebased = []
+        for start, tickers in by_start.items():
+            span = {'period': '2y'} if start is None else {'start': start}
+            n_batches += self._download(tickers, span, frames, rebased)
+
+        if rebased:
+            # 拆股/分红后全部历史复权价都会变化，旧缓存不能再拼接，丢弃后重新下载完整2年
+            logging.info(f"复权价格已变化，重新下载完整历史: {rebased}")
+            for ticker in rebased:
+                del frames[ticker]
+            n_batches += self._download(rebased, {'period': '2y'}, frames)
+
+        with open(MISSES_PATH, 'w') as f:
+            json.dump(self._misses, f)
+
+        self._frames = frames
+        logging.info(f"行情载入完成: {len(frames)} 只股票，下载 {n_batches} 批")
+
+    def _download(self, tickers, span, frames, rebased=None):
+        """
+        按 DOWNLOAD_CHUNK 分批下载，与 frames 中的缓存合并后写回 parquet。
+        rebased 不为 None 时 (增量下载)，先比较与缓存重叠日期的收盘价: 不一致说明复权基准已变，
+        该股票不合并，记入 rebased 由调用方重新下载完整历史。
+        返回: 下载批数
+        """
+        n_batches = 0
+        today = pd.Timestamp.today().date().isoformat()
+        it = iter(tickers)
+        while batch := list(islice(it, DOWNLOAD_CHUNK)):
+            n_batches += 1
+            try:
+                data = yf.download(" ".join(batch), interval="1d", group_by='ticker',
+                                   threads=True, auto_adjust=True, progress=False, **span)
+            except Exception as e:
+                logging.error(f"批量下载 {batch} 失败: {e}")
+                continue
+
+            downloaded = data.columns.get_level_values(0) if not data.empty else ()
+            news = {t: data[t].dropna() for t in batch if t in downloaded}
+            news = {t: df for t, df in news.items() if not df.empty}
+            for ticker in batch:
+                new = news.get(ticker)
+                if new is None:
+                    # 既无缓存又下载不到数据，且同批其它股票有数据 (排除整批限流/网络故障)，才记一次失败
+                    if ticker not in frames and news:
+                        misses = self._misses.get(ticker, {}).get('misses', 0) + 1
+                        self._misses[ticker] = {'misses': misses, 'last_miss': today}
+                    continue
+                self._misses.pop(ticker, None)
+
+                cached = frames.get(ticker)
+                if cached is not None and rebased is not None:
+                    overlap = cached.index.intersection(new.index)
+                    if not np.allclose(cached.loc[overlap, 'Close'].to_numpy(dtype=np.float64),
+                                       new.loc[overlap, 'Close'].to_numpy(dtype=np.float64),
+                                       rtol=ADJUST_RTOL, atol=0):
+                        rebased.append(ticker)
+                        continue
+
+                df = pd.concat([cached, new]) if cached is not None else new
+                df = df[~df.index.duplicated(keep='last')].sort_index()
+                # 只保留最近2年，价格 float32 / 成交量 uint32 存储，磁盘与内存占用减半
+                df = df.loc[df.index[-1] - pd.Timedelta(days=HISTORY_DAYS):].astype(OHLCV_DTYPES)
+                df.to_parquet(_cache_path(ticker))
+                frames[ticker] = df
+        return n_batches
+
+    def _ohlcv_arrays(self, ticker):
+        """
+        一次性取出该股票 (已复权) 自身K线的 Close/High/Low/Volume numpy 数组 (保持 float32 / uint32)。
+        后续检测都直接使用这些数组，不再反复按列名索引 DataFrame。
+        """
+        df = self._frames[ticker]
+        return tuple(df[col].to_numpy() for col in ('Close', 'High', 'Low', 'Volume'))
 
-    def _check_trend_template(self, df):
+    def _check_trend_template(self, close, high, low):
         """
         验证Mark Minervini的8大趋势准则。
+        close/high/low: 按时间升序的 float32 数组，均值在 float64 中累加
         返回: (bool, str) -> (是否通过, 状态描述)
         参考:
         """
-        if len(df) < 260:  # 确保有一年的数据
+        if len(close) < 260:  # 确保有一年的数据
             return False, "数据不足"
 
-        # 计算移动平均线
-        sma_50 = df['Close'].rolling(window=50).mean()
-        sma_150 = df['Close'].rolling(window=150).mean()
-        sma_200 = df['Close'].rolling(window=200).mean()
-
-        # 52周高低点
-        low_52w = df['Low'].rolling(window=260).min()
-        high_52w = df['High'].rolling(window=260).max()
-
-        # 获取最新一天的值
-        c = df['Close'].iloc[-1]
-        s50 = sma_50.iloc[-1]
-        s150 = sma_150.iloc[-1]
-        s200 = sma_200.iloc[-1]
-        h52 = high_52w.iloc[-1]
-        l52 = low_52w.iloc[-1]
+        # 只用到最新一天 (以及 200 日均线的 21 天前) 的值，直接对窗口切片求值，不计算整条滚动序列。
+        # 大多数股票不在上升趋势中：按顺序逐条判断，某条不满足即返回，后续均线不再计算
+        c = float(close[-1])
 
-        # 趋势判断逻辑
         # 1. 价格高于长期均线
-        c1 = c > s150 and c > s200
+        s200 = close[-200:].mean(dtype=np.float64)
+        if not c > s200:
+            return False, "Not in Trend"
+        s150 = close[-150:].mean(dtype=np.float64)
+        if not c > s150:
+            return False, "Not in Trend"
+
         # 2. 150日均线高于200日均线
-        c2 = s150 > s200
+        if not s150 > s200:
+            return False, "Not in Trend"
+
         # 3. 200日均线处于上升趋势 (比较当前与20天前)
-        c3 = s200 > sma_200.iloc[-22]
+        s200_prev = close[-221:-21].mean(dtype=np.float64)  # 截至倒数第22根K线的200日均线
+        if not s200 > s200_prev:
+            return False, "Not in Trend"
+
         # 4. 50日均线高于长期均线 (短期趋势强)
-        c4 = s50 > s150 and s50 > s200
+        s50 = close[-50:].mean(dtype=np.float64)
+        if not (s50 > s150 and s50 > s200):
+            return False, "Not in Trend"
+
         # 5. 价格高于50日均线
-        c5 = c > s50
+        if not c > s50:
+            return False, "Not in Trend"
+
         # 6. 较52周低点至少上涨30%
-        c6 = c >= (1.3 * l52)
-        # 7. 处于52周高点的25%以内
-        c7 = c >= (0.75 * h52)
+        l52 = float(low[-260:].min())
+        if not c >= (1.3 * l52):
+            return False, "Not in Trend"
 
-        if c1 and c2 and c3 and c4 and c5 and c6 and c7:
-            return True, "Stage 2 Uptrend"
-        else:
+        # 7. 处于52周高点的25%以内
+        h52 = float(high[-260:].max())
+        if not c >= (0.75 * h52):
             return False, "Not in Trend"
 
-    def _detect_vcp(self, df):
+        return True, "Stage 2 Uptrend"
+
+    @staticmethod
+    def _detect_vcp(close, volume, vol_sma50):
         """
         检测波动收缩模式 (VCP)。
         逻辑: 检查过去60天内波动率是否呈阶梯式下降。
+        vol_sma50: 50日均量，由 _vcp_signal 计算一次后与量比共用
         参考: [10, 12]
         """
-        # 将过去60天分为三个20天的时间窗口
-        # 这是一种简化的算法模拟，实际VCP可能更复杂
+        # 将过去60天分为三个20天的时间窗口，最近一段的波动率需低于5%
+        # 这是一种简化的算法模拟，实际VCP可能更复杂；计算在 numba 内核中完成
         period = 20
-        vol_sections =
-
-        for i in range(3):
-            start = -(i + 1) * period
-            end = -i * period if i != 0 else None
-            segment = df['Close'].iloc[start:end]
-            # 计算归一化波动率 (标准差 / 均值)
-            vol = segment.std() / segment.mean()
-            vol_sections.append(vol)
-
-        # vol_sections[1] 是最远的时间段, vol_sections 是最近的时间段
-        # VCP特征: 波动率逐渐降低 (Vol_Old > Vol_Mid > Vol_New)
-        # 且最近的波动率必须非常低 (例如小于3%)
-        is_contracting = (vol_sections[1] > vol_sections[2]) and \
-                         (vol_sections[2] > vol_sections)
-
-        is_tight = vol_sections < 0.05  # 5%的紧凑度阈值
-
-        # 检查成交量枯竭: 最近5天平均成交量 < 50日均量
-        vol_sma50 = df['Volume'].rolling(50).mean().iloc[-1]
-        vol_recent = df['Volume'].iloc[-5:].mean()
-        volume_dry = vol_recent < vol_sma50
-
-        return is_contracting and is_tight and volume_dry
+        # 复制为可写的 float64 数组: 输入若已是 float64 (如对齐后被上转的成交量)，
+        # ascontiguousarray 会原样返回只读视图，numba 的 float64[:] 签名不接受
+        recent_close = np.array(close[-3 * period:], dtype=np.float64)
+        recent_volume = np.array(volume[-5:], dtype=np.float64)
+        return bool(_vcp_contraction(recent_close, recent_volume, vol_sma50, period, 0.05))
 
     def analyze_stock(self, ticker):
         """
         主分析函数，整合趋势和VCP检测。
         """
         try:
-            # 下载数据，使用auto_adjust=True复权
-            df = yf.download(ticker, period="2y", interval="1d", progress=False, auto_adjust=True)
-            if df.empty or len(df) < 260:
+            if ticker not in self._frames:
+                return None
+            close, high, low, volume = self._ohlcv_arrays(ticker)
+            if len(close) < 260:
                 return None
 
             # 步骤1: 趋势模板过滤
-            is_trend, status = self._check_trend_template(df)
+            is_trend, status = self._check_trend_template(close, high, low)
             if not is_trend:
                 return None
 
-            # 步骤2: VCP形态检测
-            is_vcp = self._detect_vcp(df)
-
-            if is_vcp:
-                # 计算关键指标
-                current_price = df['Close'].iloc[-1]
-                pivot_point = df['High'].iloc[-20:].max()  # 最近20天最高价作为枢轴
-
-                # 检查是否刚突破枢轴 (当前价格 > 枢轴 且 昨日价格 <= 枢轴)
-                # 注意: 这里简化为接近枢轴或刚突破
-                volume_ratio = df['Volume'].iloc[-1] / df['Volume'].rolling(50).mean().iloc[-1]
-
-                return {
-                    "symbol": ticker,
-                    "price": current_price,
-                    "pivot": pivot_point,
-                    "volume_ratio": volume_ratio,
-                    "status": status
-                }
+            return VCPScreener._vcp_signal(ticker, close, high, volume, status)
 
         except Exception as e:
             logging.error(f"分析 {ticker} 时出错: {e}")
             return None
 
+    @staticmethod
+    def _vcp_signal(ticker, close, high, volume, status):
+        """
+        对已通过趋势模板的股票做VCP形态检测，成立时返回信号字典。
+        静态方法：不依赖实例状态，可直接提交到子进程执行 (只传三个 numpy 数组)。
+        """
+        # 50日均量只计算一次，VCP成交量枯竭判断与量比共用
+        vol_sma50 = float(volume[-50:].mean(dtype=np.float64))
+
+        # 步骤2: VCP形态检测
+        is_vcp = VCPScreener._detect_vcp(close, volume, vol_sma50)
+
+        if is_vcp:
+            # 计算关键指标
+            current_price = float(close[-1])
+            pivot_point = float(high[-20:].max())  # 最近20天最高价作为枢轴
+
+            # 检查是否刚突破枢轴 (当前价格 > 枢轴 且 昨日价格 <= 枢轴)
+            # 注意: 这里简化为接近枢轴或刚突破
+            volume_ratio = volume[-1] / vol_sma50
+
+            return {
+                "symbol": ticker,
+                "price": current_price,
+                "pivot": pivot_point,
+                "volume_ratio": volume_ratio,
+                "status": status
+            }
+        return None
+
+    def screen_trend_template(self):
+        """
+        对全部股票一次性向量化验证趋势模板，规则与 _check_trend_template 相同。
+        每只股票取自身最近260根K线 (不对齐到并集日历、不前向填充) 右对齐拼成 (260 x 股票) 矩阵，
+        因此有停牌缺K线的股票，各窗口与逐股票检测完全一致。
+        返回: 通过的股票代码列表 (按 self.tickers 顺序)
+        """
+        tickers = [t for t in self.tickers
+                   if t in self._frames and len(self._frames[t]) >= 260]  # 确保有一年的数据
+        if not tickers:
+            return []
+
+        # 保持 float32 读取 (带宽减半)，均值在 float64 中累加，逐股票结果再转为 float64 比较
+        def tail(col):
+            return np.column_stack([self._frames[t][col].to_numpy()[-260:] for t in tickers])
+
+        close, high, low = tail('Close'), tail('High'), tail('Low')
+
+        # 只需最新一天的指标值：对全部股票沿时间轴做一次窗口切片归约，均为按股票排列的一维数组
+        c = close[-1].astype(np.float64)
+        s50 = close[-50:].mean(axis=0, dtype=np.float64)
+        s150 = close[-150:].mean(axis=0, dtype=np.float64)
+        s200 = close[-200:].mean(axis=0, dtype=np.float64)
+        s200_prev = close[-221:-21].mean(axis=0, dtype=np.float64)  # 截至倒数第22根K线的200日均线
+        l52 = low[-260:].min(axis=0).astype(np.float64)
+        h52 = high[-260:].max(axis=0).astype(np.float64)
+
+        mask = ((c > s150) & (c > s200)                   # 1. 价格高于长期均线
+                & (s150 > s200)                           # 2. 150日均线高于200日均线
+                & (s200 > s200_prev)                      # 3. 200日均线处于上升趋势
+                & (s50 > s150) & (s50 > s200)             # 4. 50日均线高于长期均线
+                & (c > s50)                               # 5. 价格高于50日均线
+                & (c >= 1.3 * l52)                        # 6. 较52周低点至少上涨30%
+                & (c >= 0.75 * h52))                      # 7. 处于52周高点的25%以内
+        return [t for t, ok in zip(tickers, mask) if ok]
+
+    def scan(self, max_workers=None):
+        """
+        扫描 prefetch 的全部股票：先向量化过滤趋势模板，再把通过者的VCP检测分发到多进程。
+        每个任务只传该股票自己的数组，不传全部行情；通知仍在主进程发送。
+        :param max_workers: 进程数，默认为 CPU 核数
+        返回: 信号字典列表 (按股票代码顺序)
+        """
+        candidates = self.screen_trend_template()
+        if not candidates:
+            return []
+
+        results = []
+        with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            futures = {}
+            for ticker in candidates:
+                close, high, _, volume = self._ohlcv_arrays(ticker)
+                futures[ticker] = executor.submit(VCPScreener._vcp_signal, ticker,
+                                                  close, high, volume, "Stage 2 Uptrend")
+            for ticker, future in futures.items():
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logging.error(f"分析 {ticker} 时出错: {e}")
+                    continue
+                if result:
+                    results.append(result)
+        return results
+
 
 if __name__ == "__main__":
     # --- 用户配置区 (请替换为真实Key) ---
@@ -255,17 +554,16 @@ if __name__ == "__main__":
 
     logging.info(f"开始扫描 {len(tickers)} 只股票...")
     screener = VCPScreener(tickers)
+    screener.prefetch()
 
-    # 3. 循环扫描
-    found_count = 0
-    for ticker in tickers:
-        result = screener.analyze_stock(ticker)
-
-        if result:
-            found_count += 1
-            logging.info(f"发现信号: {ticker}")
+    # 3. 扫描 (趋势模板对全部股票一次向量化完成)
+    results = list(screener.scan())
 
-            # 4. 触发多渠道通知
+    # 4. 触发多渠道通知: 所有信号 x 渠道并发发送，总耗时约为单次往返而非逐条累加
+    scan_time = _utc_timestamp()  # 同一批信号共用一个时间戳
+    with ThreadPoolExecutor(max_workers=HTTP_POOL_MAXSIZE) as pool:
+        for result in results:
+            logging.info(f"发现信号: {result['symbol']}")
 
             # Telegram推送
             msg_text = (f"🚀 *VCP 突破预警*\n"
@@ -273,18 +571,21 @@ if __name__ == "__main__":
                         f"价格: ${result['price']:.2f}\n"
                         f"枢轴点: ${result['pivot']:.2f}\n"
                         f"量能: {result['volume_ratio']:.1f}x")
-            notifier.send_telegram(msg_text)
+            pool.submit(notifier.send_telegram, msg_text)
 
             # Discord推送
-            notifier.send_discord(
+            pool.submit(
+                notifier.send_discord,
                 result['symbol'],
                 result['price'],
                 result['pivot'],
                 result['volume_ratio'],
-                result['status']
+                result['status'],
+                scan_time
             )
 
-    logging.info(f"扫描完成。共发现 {found_count} 个潜在机会。")
+    logging.info(f"扫描完成。共发现 {len(results)} 个潜在机会。")
+    notifier.close()
 
 # 每个交易日的美东时间下午4:05（收盘后）运行一次扫描
 # 5 16 * * 1-5 /usr/bin/python3 /home/user/vcp_bot/main.py >> /var/log/vcp_bot.log 2>&1
\ No newline at end of file